@@ -1,6 +1,227 @@
 import os
+from functools import lru_cache
 import numpy as np
-from PIL import Image
+from PIL import Image, GifImagePlugin
+
+BLEND_MODES = ('add', 'max', 'over')
+PACK_FORMATS = ('rle', 'bits')
+
+
+def overlap(dst_shape, src_shape, y0: int = 0, x0: int = 0):
+    """
+    Slices of overlapping region of src placed in (y0, x0) of dst, None if they don't overlap
+    """
+    dst_y0, dst_x0 = max(y0, 0), max(x0, 0)
+    dst_y1, dst_x1 = min(y0 + src_shape[0], dst_shape[0]), min(x0 + src_shape[1], dst_shape[1])
+    if dst_y1 <= dst_y0 or dst_x1 <= dst_x0:
+        return None
+
+    return ((slice(dst_y0, dst_y1), slice(dst_x0, dst_x1)),
+            (slice(dst_y0 - y0, dst_y1 - y0), slice(dst_x0 - x0, dst_x1 - x0)))
+
+
+def blend(dst, src, mode: str = 'add', top: int = None):
+    """
+    Composites src into dst in place
+    mode: str           'add' - sum limited by max value of both layers, 'max' - lighten, 'over' - non-zero src over dst
+    top: int            Max value of layer that dst is taken from, max of dst is used if not given
+    """
+    if mode == 'add':
+        # Sum is saturated by max value of dst type, so it never wraps
+        src_max = int(np.max(src))
+        max_o = min(max(int(dst.max()) if top is None else top, src_max), np.iinfo(dst.dtype).max)
+        # Values of src above dst type don't fit in dst, they are limited by copy
+        if src_max > max_o:
+            np.add(dst, np.minimum(src, max_o - dst), out=dst, casting='unsafe')
+            return dst
+
+        # dst + min(src, max_o - dst) is max_o - max(max_o - dst - src, 0), counted in dst without temporaries
+        np.subtract(max_o, dst, out=dst, casting='unsafe')
+        np.maximum(dst, src, out=dst, casting='unsafe')
+        np.subtract(dst, src, out=dst, casting='unsafe')
+        np.subtract(max_o, dst, out=dst, casting='unsafe')
+
+    elif mode == 'max':
+        np.maximum(dst, src, out=dst, casting='unsafe')
+
+    elif mode == 'over':
+        np.copyto(dst, src, casting='unsafe', where=src != 0)
+
+    else:
+        print(f'Unknown blend mode {mode}, use one of {BLEND_MODES}')
+        raise Exception
+    return dst
+
+
+def frame_image(frame):
+    return Image.fromarray(255 - np.array(frame[::-1], dtype='uint8'), mode='L')
+
+
+def new_field(shape, memmap: str = '', dtype: str = 'uint16'):
+    if memmap:
+        return np.memmap(memmap, dtype=dtype, mode='w+', shape=shape)
+    return np.zeros(shape=shape, dtype=dtype)
+
+
+def empty_box(shape):
+    # Box (y0, y1, x0, x1) that contains nothing, any box joined with it stays the same
+    return np.array((shape[0], 0, shape[1], 0), dtype='int64')
+
+
+def join_boxes(box1, box2):
+    return np.array((min(box1[0], box2[0]), max(box1[1], box2[1]), min(box1[2], box2[2]), max(box1[3], box2[3])),
+                    dtype='int64')
+
+
+def frame_box(frame, box):
+    """
+    Box (y0, y1, x0, x1) out of which frame is empty. Given box is used if frame isn't empty inside it,
+    otherwise whole frame is scanned, so pixels written straight to field aren't lost
+    """
+    y0, y1, x0, x1 = (int(v) for v in box)
+    if y1 > y0 and x1 > x0 and frame[y0:y1, x0:x1].any():
+        return box
+
+    rows, cols = np.flatnonzero(frame.any(axis=1)), np.flatnonzero(frame.any(axis=0))
+    if len(rows) == 0:
+        return empty_box(frame.shape)
+    return np.array((rows[0], rows[-1] + 1, cols[0], cols[-1] + 1), dtype='int64')
+
+
+def frame_delta(prev, frame, box):
+    """
+    Smallest rectangle of frame that differs from prev as (y0, x0, patch), None if frames are equal
+    box: array          Box (y0, y1, x0, x1) out of which frames are known to be equal
+    """
+    y0, y1, x0, x1 = (int(v) for v in box)
+    if y1 <= y0 or x1 <= x0:
+        return None
+
+    diff = prev[y0:y1, x0:x1] != frame[y0:y1, x0:x1]
+    rows, cols = np.flatnonzero(diff.any(axis=1)), np.flatnonzero(diff.any(axis=0))
+    if len(rows) == 0:
+        return None
+    return y0 + rows[0], x0 + cols[0], np.array(frame[y0 + rows[0]:y0 + rows[-1] + 1, x0 + cols[0]:x0 + cols[-1] + 1])
+
+
+class GifWriter:
+    """
+    Writes frames to gif file one by one, empty frames are written only if non-empty frame follows them.
+    Every frame after first is written as rectangle that changed since previous frame
+    filename: str       Name of gif file in IMG_FOLDER
+    duration: float     Duration of every frame in ms
+    empty_frames: int   Number of empty frames waiting for non-empty frame
+    prev: np.array      Copy of last written frame
+    prev_box: array     Box out of which last written frame is empty
+    """
+
+    def __init__(self, filename: str, duration: float):
+        self.filename = filename
+        self.duration = duration
+        self.empty_frames = 0
+        self.fp = None
+        self.prev = None
+        self.prev_box = None
+
+    def write(self, frame, box=None):
+        # Frame must be empty out of non-empty box, whole frame is checked if box isn't given or is empty
+        box = frame_box(frame, empty_box(frame.shape) if box is None else box)
+        if box[1] <= box[0]:
+            self.empty_frames += 1
+            return
+
+        if self.fp is None:
+            self.fp = open(os.environ['IMG_FOLDER'] + self.filename, 'wb')
+            self.fp.write(b''.join(GifImagePlugin.getheader(frame_image(frame), info={'loop': 0})[0]))
+
+        if self.empty_frames:
+            empty = np.zeros_like(frame)
+            self.write_delta(empty, empty_box(frame.shape))
+            # Equal frames are written as one unchanged pixel
+            for _ in range(self.empty_frames - 1):
+                self.write_delta(empty, empty_box(frame.shape))
+            self.empty_frames = 0
+        self.write_delta(frame, box)
+
+    def write_delta(self, frame, box):
+        if self.prev is None:
+            self.prev = np.array(frame)
+            self.prev_box = box
+            self.fp.write(b''.join(GifImagePlugin.getdata(frame_image(frame), duration=self.duration)))
+            return
+
+        delta = frame_delta(self.prev, frame, join_boxes(self.prev_box, box))
+        y0, x0, patch = (frame.shape[0] - 1, 0, frame[-1:, :1]) if delta is None else delta
+        self.prev[y0:y0 + patch.shape[0], x0:x0 + patch.shape[1]] = patch
+        self.prev_box = box
+        # Field rows are flipped in image
+        offset = (int(x0), int(frame.shape[0] - y0 - patch.shape[0]))
+        self.fp.write(b''.join(GifImagePlugin.getdata(frame_image(patch), offset=offset,
+                                                      duration=self.duration, disposal=1)))
+
+    def close(self):
+        if self.fp is not None:
+            self.fp.write(b';')
+            self.fp.close()
+            self.fp = None
+
+
+class PackedFrames:
+    """
+    Read only frames of field kept inside their dirty boxes in compact form, frame is unpacked on indexing
+    shape: tuple        Shape of unpacked field
+    dtype: np.dtype     Type of unpacked field
+    fmt: str            'rle' - runs of equal values, 'bits' - bit mask for every non-zero value
+    boxes: np.array     Boxes (y0, y1, x0, x1) of frames
+    data: list          Packed frames
+    """
+
+    def __init__(self, field, boxes, fmt: str = 'rle'):
+        if fmt not in PACK_FORMATS:
+            print(f'Unknown pack format {fmt}, use one of {PACK_FORMATS}')
+            raise Exception
+
+        self.shape = field.shape
+        self.dtype = field.dtype
+        self.fmt = fmt
+        self.boxes = np.maximum([frame_box(field[fr], box) for fr, box in enumerate(boxes)], 0).reshape(-1, 4)
+        self.data = [self.pack_frame(field[fr], box) for fr, box in enumerate(self.boxes)]
+
+    def pack_frame(self, frame, box):
+        crop = np.ravel(frame[box[0]:box[1], box[2]:box[3]])
+        if self.fmt == 'rle':
+            starts = np.flatnonzero(np.diff(crop, prepend=~crop[:1])).astype('uint32')
+            return starts, crop[starts]
+
+        values = np.unique(crop[crop != 0])
+        return values, [np.packbits(crop == value) for value in values]
+
+    def __getitem__(self, fr: int):
+        frame = np.zeros(shape=self.shape[1:], dtype=self.dtype)
+        y0, y1, x0, x1 = self.boxes[fr]
+        if y1 <= y0 or x1 <= x0:
+            return frame
+
+        size = (y1 - y0) * (x1 - x0)
+        if self.fmt == 'rle':
+            starts, values = self.data[fr]
+            crop = np.repeat(values, np.diff(starts, append=size))
+
+        else:
+            crop = np.zeros(shape=size, dtype=self.dtype)
+            for value, bits in zip(*self.data[fr]):
+                crop[np.unpackbits(bits, count=size).view('bool')] = value
+        frame[y0:y1, x0:x1] = crop.reshape(y1 - y0, x1 - x0)
+        return frame
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def nbytes(self):
+        if self.fmt == 'rle':
+            return sum(starts.nbytes + values.nbytes for starts, values in self.data)
+        return sum(values.nbytes + sum(bits.nbytes for bits in masks) for values, masks in self.data)
 
 
 class ArtField:
@@ -10,14 +231,16 @@ class ArtField:
     x0: int             Origin of X field axis
     y0: int             Origin of Y field axis
     field: np.array     Field container
+    memmap: str         Path of file that backs field on disk, field is kept in memory if empty
     """
 
-    def __init__(self, y: int = 1, x: int = 1, y0: int = 0, x0: int = 0):
+    def __init__(self, y: int = 1, x: int = 1, y0: int = 0, x0: int = 0, memmap: str = ''):
         if y < 0 or x < 0:
             print('Field must have positive axis size value')
             raise Exception
 
-        if y * x > 80000000:
+        # Disk backed field isn't limited by memory
+        if y * x > 80000000 and not memmap:
             print('Too big field to construct')
             raise Exception
 
@@ -25,28 +248,27 @@ class ArtField:
         self.y0 = y0
         self.x_size = x
         self.y_size = y
-        self.field = np.zeros(shape=(self.y_size, self.x_size), dtype='uint16')
+        self.memmap = memmap
+        self.field = new_field(shape=(self.y_size, self.x_size), memmap=self.memmap)
 
     def clear_field(self):
+        if self.memmap:
+            self.field.fill(0)
+            return
         self.field = np.zeros(shape=(self.y_size, self.x_size), dtype='uint16')
 
     def save_field(self, filename='draw.png'):
-        self.field = np.array(self.field, dtype='uint8')
-        Image.fromarray(255 - self.field[::-1], mode='L').save(os.environ['IMG_FOLDER']+filename)
-        self.field = np.array(self.field, dtype='uint16')
+        frame_image(self.field).save(os.environ['IMG_FOLDER']+filename)
 
-    def __add__(self, other):
-        chg_fld = self.field[max(other.y0, 0):max(other.field.shape[0] + other.y0, 0),
-                             max(other.x0, 0):max(other.field.shape[1] + other.x0, 0)]
-        oth_fld = other.field[max(-other.y0, 0):max(other.field.shape[0] - other.y0, other.field.shape[0]),
-                              max(-other.x0, 0):max(other.field.shape[1] - other.x0, other.field.shape[1])]
-        max_o = max(chg_fld.max(), oth_fld.max())
-        chg_fld += oth_fld
-        chg_fld[chg_fld > max_o] = max_o
-        self.field[max(other.y0, 0):max(other.field.shape[0] + other.y0, 0),
-                   max(other.x0, 0):max(other.field.shape[1] + other.x0, 0)] = chg_fld
+    def place_art(self, fld, mode: str = 'add'):
+        region = overlap(self.field.shape, fld.field.shape, fld.y0, fld.x0)
+        if region is not None:
+            blend(self.field[region[0]], fld.field[region[1]], mode=mode)
         return self
 
+    def __add__(self, other):
+        return self.place_art(other)
+
 
 class AnimatedField:
     """
@@ -55,7 +277,14 @@ class AnimatedField:
     x0: int             Origin of X field axis
     y0: int             Origin of Y field axis
     frames: int         Number of frames in out gif file
-    field: np.array     Field container
+    field: np.array     Field container, in stream mode contains only frames of ring
+    stream: str         Name of gif file that frames are flushed to one by one, whole field is kept in memory if empty
+    ring: int           Number of frames kept in memory in stream mode
+    flushed: int        Number of frames already flushed to file in stream mode
+    memmap: str         Path of file that backs field on disk, field is kept in memory if empty
+    dirty: np.array     Boxes (y0, y1, x0, x1) of every frame out of which frame is empty, kept by place_art and
+                        __add__, direct writes to field must be marked by mark_dirty, frames with empty box are scanned
+    dtype: str          Type of field values, 'uint8' halves memory, sums are saturated in both types
     """
 
     def __init__(self,
@@ -63,12 +292,17 @@ class AnimatedField:
                  x: int = 1,
                  y0: int = 0,
                  x0: int = 0,
-                 frames: int = 60):
+                 frames: int = 60,
+                 stream: str = '',
+                 ring: int = 8,
+                 memmap: str = '',
+                 dtype: str = 'uint16'):
         if y < 0 or x < 0:
             print('Field must have positive axis size value')
             raise Exception
 
-        if y * x > 80000000:
+        # Disk backed field isn't limited by memory
+        if y * x > 80000000 and not memmap:
             print('Too big field to construct')
             raise Exception
 
@@ -76,48 +310,291 @@ class AnimatedField:
         self.y0 = y0
         self.x_size = x
         self.y_size = y
+        self.dtype = dtype
         self.frames = frames
-        self.field = np.zeros(shape=(self.frames, self.y_size, self.x_size), dtype='uint16')
+        self.stream = stream
+        self.ring = max(1, min(ring, self.frames)) if self.stream else self.frames
+        self.flushed = 0
+        # Arts placed on frames ahead of ring, placed when ring reaches them
+        self.deferred = []
+        self.writer = GifWriter(self.stream, duration=1000/self.frames) if self.stream else None
+        # Ring of streamed field is small enough to be kept in memory
+        self.memmap = '' if self.stream else memmap
+        self.field = new_field(shape=(self.ring, self.y_size, self.x_size), memmap=self.memmap, dtype=self.dtype)
+        self.dirty = np.tile(empty_box((self.y_size, self.x_size)), (self.frames, 1))
 
     def save_field(self, filename='draw.gif'):
-        self.field = np.array(self.field, dtype='uint8')
-        last_frame = max(np.where(self.field != 0)[0])
-        imgs = [Image.fromarray(255 - self.field[i, ::-1, :], mode='L') for i in range(last_frame + 1)]
-        imgs[0].save(os.environ['IMG_FOLDER']+filename,
-                     save_all=True,
-                     append_images=imgs[1:],
-                     loop=0,
-                     duration=1000/self.frames)
-        self.field = np.array(self.field, dtype='uint16')
-
-    def place_art(self, fld: ArtField, frame):
-        tmp_art = ArtField(y=self.y_size, x=self.x_size)
-        tmp_art.field = self.field[frame]
-        old_y0 = fld.y0
-        old_x0 = fld.x0
-        fld.y0 -= self.y0
-        fld.x0 -= self.x0
-        tmp_art += fld
-        fld.y0 = old_y0
-        fld.x0 = old_x0
-        self.field[frame] = tmp_art.field
+        if self.stream:
+            while self.flushed < self.frames:
+                self.flush_frame()
+            self.writer.close()
+            return
+
+        # Only changed rectangles of frames are encoded, disk backed field isn't loaded whole
+        writer = GifWriter(filename, duration=1000/self.frames)
+        for fr in range(self.frames):
+            writer.write(self.field[fr], self.dirty[fr])
+        writer.close()
+
+    def mark_dirty(self, frames, region):
+        # Extends boxes of frames by region slices
+        self.dirty[frames, 0] = np.minimum(self.dirty[frames, 0], region[0].start)
+        self.dirty[frames, 1] = np.maximum(self.dirty[frames, 1], region[0].stop)
+        self.dirty[frames, 2] = np.minimum(self.dirty[frames, 2], region[1].start)
+        self.dirty[frames, 3] = np.maximum(self.dirty[frames, 3], region[1].stop)
+
+    def join_dirty(self, boxes):
+        # Extends boxes of all frames by other boxes, (y0, x0) are mins and (y1, x1) are maxes
+        np.minimum(self.dirty[:, ::2], boxes[:, ::2], out=self.dirty[:, ::2])
+        np.maximum(self.dirty[:, 1::2], boxes[:, 1::2], out=self.dirty[:, 1::2])
+
+    def delta_frames(self):
+        """
+        Frames as list of (y0, x0, patch), where patch is rectangle changed since previous frame,
+        first frame is compared with empty one, unchanged frames have empty patch
+        """
+        prev = np.zeros(shape=(self.y_size, self.x_size), dtype=self.field.dtype)
+        prev_box = empty_box(prev.shape)
+        deltas = []
+        for fr in range(self.frames):
+            frame = self.field[fr]
+            box = frame_box(frame, self.dirty[fr])
+            delta = frame_delta(prev, frame, join_boxes(prev_box, box))
+            deltas.append((0, 0, frame[:0, :0].copy()) if delta is None else delta)
+            prev, prev_box = frame, box
+        return deltas
+
+    def load_deltas(self, deltas):
+        # Restores field from delta_frames list
+        frame = np.zeros(shape=(self.y_size, self.x_size), dtype=self.field.dtype)
+        for fr, (y0, x0, patch) in enumerate(deltas[:self.frames]):
+            frame[y0:y0 + patch.shape[0], x0:x0 + patch.shape[1]] = patch
+            self.field[fr] = frame
+            self.dirty[fr] = frame_box(frame, empty_box(frame.shape))
+
+    def pack(self, fmt: str = 'rle'):
+        # Frames are packed when drawing is finished, packed field can be saved but not drawn on
+        if self.stream:
+            print('Streamed field can not be packed')
+            raise Exception
+
+        if not isinstance(self.field, PackedFrames):
+            self.field = PackedFrames(self.field, self.dirty, fmt=fmt)
+        return self
+
+    def unpack(self):
+        if isinstance(self.field, PackedFrames):
+            packed = self.field
+            self.field = new_field(shape=packed.shape, memmap=self.memmap, dtype=self.dtype)
+            for fr in range(len(packed)):
+                self.field[fr] = packed[fr]
+        return self
+
+    def get_frame(self, frame: int):
+        if isinstance(self.field, PackedFrames):
+            print('Packed field is read only, unpack it before drawing')
+            raise Exception
+
+        if not self.stream:
+            return self.field[frame]
+
+        if frame < self.flushed:
+            print(f'Frame {frame} is already flushed to {self.stream}')
+            raise Exception
+
+        if frame == self.flushed + self.ring:
+            self.flush_frame()
+
+        if frame >= self.flushed + self.ring:
+            return None
+        return self.field[frame % self.ring]
+
+    def flush_frame(self):
+        frame = self.field[self.flushed % self.ring]
+        self.writer.write(frame, self.dirty[self.flushed])
+        frame.fill(0)
+        self.flushed += 1
+        # Frame that entered ring gets arts placed on it in advance
+        entered = self.flushed + self.ring - 1
+        deferred = [art for art in self.deferred if art[1] == entered]
+        if deferred:
+            self.deferred = [art for art in self.deferred if art[1] != entered]
+            for fld, fr, mode in deferred:
+                self.place_art(fld, fr, mode=mode)
+
+    def place_art(self, fld: ArtField, frame, mode: str = 'add'):
+        region = overlap(self.field.shape[1:], fld.field.shape, fld.y0 - self.y0, fld.x0 - self.x0)
+        if region is None:
+            return
+
+        target = self.get_frame(frame)
+        if target is None:
+            art = ArtField(y=0, x=0, y0=fld.y0, x0=fld.x0)
+            art.field = fld.field.copy()
+            self.deferred.append((art, frame, mode))
+            return
+        blend(target[region[0]], fld.field[region[1]], mode=mode)
+        self.mark_dirty(frame, region[0])
 
     def __add__(self, other):
-        chg_fld = self.field[:other.field.shape[0],
-                             max(other.y0, 0):max(other.field.shape[1]+other.y0, 0),
-                             max(other.x0, 0):max(other.field.shape[2]+other.x0, 0)]
-        oth_fld = other.field[:min(self.field.shape[0], other.field.shape[0]),
-                              max(-other.y0, 0):max(other.field.shape[1]-other.y0, other.field.shape[1]),
-                              max(-other.x0, 0):max(other.field.shape[2]-other.x0, other.field.shape[2])]
-        max_o = max(chg_fld.max(), oth_fld.max())
-        chg_fld += oth_fld
-        chg_fld[chg_fld > max_o] = max_o
-        self.field[:other.field.shape[0],
-                   max(other.y0, 0):max(other.field.shape[1] + other.y0, 0),
-                   max(other.x0, 0):max(other.field.shape[2] + other.x0, 0)] = chg_fld
+        if isinstance(self.field, PackedFrames) or isinstance(other.field, PackedFrames):
+            print('Packed fields can not be placed, unpack them before')
+            raise Exception
+
+        frames = min(self.frames, other.frames)
+        region = overlap(self.field.shape[1:], other.field.shape[1:], other.y0, other.x0)
+        if region is None or frames == 0:
+            return self
+
+        if other.stream:
+            print('Streamed field can not be placed on other field')
+            raise Exception
+
+        if self.stream:
+            for fr in range(frames):
+                art = ArtField(y=0, x=0, y0=other.y0 + self.y0, x0=other.x0 + self.x0)
+                art.field = other.field[fr]
+                self.place_art(art, fr)
+            return self
+        blend(self.field[(slice(frames),) + region[0]], other.field[(slice(frames),) + region[1]])
+        self.mark_dirty(slice(frames), region[0])
         return self
 
 
+# Pixel font of 3x5 glyphs, rows are listed from top to bottom, '#' is drawn pixel
+FONT = {'0': ('###', '#.#', '#.#', '#.#', '###'),
+        '1': ('..#', '.##', '..#', '..#', '..#'),
+        '2': ('###', '..#', '###', '#..', '###'),
+        '3': ('###', '..#', '###', '..#', '###'),
+        '4': ('#.#', '#.#', '###', '..#', '..#'),
+        '5': ('###', '#..', '###', '..#', '###'),
+        '6': ('#..', '#..', '###', '#.#', '###'),
+        '7': ('###', '..#', '..#', '..#', '..#'),
+        '8': ('###', '#.#', '###', '#.#', '###'),
+        '9': ('###', '#.#', '###', '..#', '..#'),
+        '-': ('...', '...', '###', '...', '...'),
+        '+': ('...', '.#.', '###', '.#.', '...'),
+        '.': ('...', '...', '...', '...', '.#.'),
+        ',': ('...', '...', '...', '.#.', '#..'),
+        ':': ('...', '.#.', '...', '.#.', '...'),
+        '/': ('..#', '..#', '.#.', '#..', '#..'),
+        '=': ('...', '###', '...', '###', '...'),
+        '(': ('.#.', '#..', '#..', '#..', '.#.'),
+        ')': ('.#.', '..#', '..#', '..#', '.#.'),
+        ' ': ('...', '...', '...', '...', '...'),
+        'A': ('.#.', '#.#', '###', '#.#', '#.#'),
+        'B': ('##.', '#.#', '##.', '#.#', '##.'),
+        'C': ('.##', '#..', '#..', '#..', '.##'),
+        'D': ('##.', '#.#', '#.#', '#.#', '##.'),
+        'E': ('###', '#..', '##.', '#..', '###'),
+        'F': ('###', '#..', '##.', '#..', '#..'),
+        'G': ('.##', '#..', '#.#', '#.#', '.##'),
+        'H': ('#.#', '#.#', '###', '#.#', '#.#'),
+        'I': ('###', '.#.', '.#.', '.#.', '###'),
+        'J': ('..#', '..#', '..#', '#.#', '.#.'),
+        'K': ('#.#', '#.#', '##.', '#.#', '#.#'),
+        'L': ('#..', '#..', '#..', '#..', '###'),
+        'M': ('#.#', '###', '###', '#.#', '#.#'),
+        'N': ('##.', '#.#', '#.#', '#.#', '#.#'),
+        'O': ('.#.', '#.#', '#.#', '#.#', '.#.'),
+        'P': ('##.', '#.#', '##.', '#..', '#..'),
+        'Q': ('.#.', '#.#', '#.#', '##.', '.##'),
+        'R': ('##.', '#.#', '##.', '#.#', '#.#'),
+        'S': ('.##', '#..', '.#.', '..#', '##.'),
+        'T': ('###', '.#.', '.#.', '.#.', '.#.'),
+        'U': ('#.#', '#.#', '#.#', '#.#', '###'),
+        'V': ('#.#', '#.#', '#.#', '#.#', '.#.'),
+        'W': ('#.#', '#.#', '###', '###', '#.#'),
+        'X': ('#.#', '#.#', '.#.', '#.#', '#.#'),
+        'Y': ('#.#', '#.#', '.#.', '.#.', '.#.'),
+        'Z': ('###', '..#', '.#.', '#..', '###')}
+FONT_INDEX = {char: idx for idx, char in enumerate(FONT)}
+NUMBER_CHARS = '0123456789-'
+
+
+@lru_cache(maxsize=None)
+def font_atlas(size: int = 1):
+    # Glyphs with one column of spacing in field orientation, every pixel is scaled to size x size square
+    atlas = np.array([[[255 if px == '#' else 0 for px in row + '.'] for row in glyph] for glyph in FONT.values()],
+                     dtype='uint16')
+    atlas = np.ascontiguousarray(atlas[:, ::-1].repeat(size, axis=1).repeat(size, axis=2))
+    atlas.flags.writeable = False
+    return atlas
+
+
+def glyph_indices(text: str):
+    if any(char not in FONT_INDEX and char.upper() not in FONT_INDEX for char in text):
+        print(f'Unknown symbol in label {text}')
+        raise Exception
+    return [FONT_INDEX.get(char, FONT_INDEX.get(char.upper())) for char in text]
+
+
+@lru_cache(maxsize=1024)
+def label_field(text: str, size: int = 1):
+    # Whole label is gathered from glyph atlas at once, labels are memoized
+    atlas = font_atlas(size)
+    glyphs = atlas[glyph_indices(text)]
+    field = glyphs.transpose(1, 0, 2).reshape(atlas.shape[1], len(text) * atlas.shape[2])
+    field.flags.writeable = False
+    return field
+
+
+def draw_labels(field, texts, ys, xs, size: int = 1, density: int = 255):
+    """
+    Draws all labels into field with one write, parts out of field are clipped
+    texts: list         Labels text
+    ys, xs: array       Positions of labels left bottom corners
+    """
+    atlas = font_atlas(size)
+    lens = np.array([len(text) for text in texts], dtype='int64')
+    if lens.sum() == 0:
+        return field
+
+    glyphs = atlas[glyph_indices(''.join(texts))]
+    first = np.cumsum(lens) - lens
+    char_y = np.repeat(np.asarray(ys, dtype='int64'), lens)
+    char_x = (np.repeat(np.asarray(xs, dtype='int64'), lens)
+              + (np.arange(lens.sum()) - np.repeat(first, lens)) * atlas.shape[2])
+    glyph_y, glyph_x = np.indices(atlas.shape[1:])
+    px_y = char_y[:, None, None] + glyph_y
+    px_x = char_x[:, None, None] + glyph_x
+    drawn = (glyphs != 0) & (px_y >= 0) & (px_y < field.shape[0]) & (px_x >= 0) & (px_x < field.shape[1])
+    field[px_y[drawn], px_x[drawn]] = density
+    return field
+
+
+def number_field(number: str):
+    if any(char not in NUMBER_CHARS for char in number):
+        print('wrong number')
+        raise Exception
+    return label_field(number)
+
+
+class Label:
+    """
+    text: str           Text of label, digits, latin letters and . , + - : / = ( ) symbols
+    size: int           Size multiplier of 4x5 pixel glyphs
+    opacity: int        Opacity of label visualization
+    fld: ArtField       Image container
+    x0: int             Origin of X field axis
+    y0: int             Origin of Y field axis
+    """
+
+    def __init__(self, text: str, y0: int = 0, x0: int = 0, size: int = 1, opacity: int = 100):
+        self.text = text
+        self.size = max(1, size)
+        self.opacity = max(0, opacity) if opacity < 100 else 100
+        field = label_field(self.text, self.size)
+        self.fld = ArtField(x0=x0, y0=y0, y=field.shape[0], x=field.shape[1])
+        self.fld.field[:] = field
+
+        if self.opacity < 100:
+            self.fld.field[field != 0] = round(255 * self.opacity / 100)
+
+    def get_label(self):
+        return self.fld
+
+
 class Number:
     """
     num: str            String interpretation of number
@@ -129,80 +606,7 @@ class Number:
     def __init__(self, number, y0=0, x0=0):
 
         self.fld = ArtField(x0=x0, y0=y0, y=5, x=len(number)*4)
-
-        for idx, num in enumerate(number):
-            num_fld = ArtField(y=5, x=4, x0=idx*4)
-            if num == '-':
-                num_fld.field = np.array(([0, 0, 0, 0],
-                                          [0, 0, 0, 0],
-                                          [255, 255, 255, 0],
-                                          [0, 0, 0, 0],
-                                          [0, 0, 0, 0]), dtype='uint8')
-            elif num == '0':
-                num_fld.field = np.array(([255, 255, 255, 0],
-                                          [255, 0, 255, 0],
-                                          [255, 0, 255, 0],
-                                          [255, 0, 255, 0],
-                                          [255, 255, 255, 0]), dtype='uint8')
-            elif num == '1':
-                num_fld.field[::-1] = np.array(([0, 0, 255, 0],
-                                                [0, 255, 255, 0],
-                                                [0, 0, 255, 0],
-                                                [0, 0, 255, 0],
-                                                [0, 0, 255, 0]), dtype='uint8')
-            elif num == '2':
-                num_fld.field[::-1] = np.array(([255, 255, 255, 0],
-                                                [0, 0, 255, 0],
-                                                [255, 255, 255, 0],
-                                                [255, 0, 0, 0],
-                                                [255, 255, 255, 0]), dtype='uint8')
-            elif num == '3':
-                num_fld.field = np.array(([255, 255, 255, 0],
-                                          [0, 0, 255, 0],
-                                          [255, 255, 255, 0],
-                                          [0, 0, 255, 0],
-                                          [255, 255, 255, 0]), dtype='uint8')
-            elif num == '4':
-                num_fld.field[::-1] = np.array(([255, 0, 255, 0],
-                                                [255, 0, 255, 0],
-                                                [255, 255, 255, 0],
-                                                [0, 0, 255, 0],
-                                                [0, 0, 255, 0]), dtype='uint8')
-            elif num == '5':
-                num_fld.field[::-1] = np.array(([255, 255, 255, 0],
-                                                [255, 0, 0, 0],
-                                                [255, 255, 255, 0],
-                                                [0, 0, 255, 0],
-                                                [255, 255, 255, 0]), dtype='uint8')
-            elif num == '6':
-                num_fld.field[::-1] = np.array(([255, 0, 0, 0],
-                                                [255, 0, 0, 0],
-                                                [255, 255, 255, 0],
-                                                [255, 0, 255, 0],
-                                                [255, 255, 255, 0]), dtype='uint8')
-            elif num == '7':
-                num_fld.field[::-1] = np.array(([255, 255, 255, 0],
-                                                [0, 0, 255, 0],
-                                                [0, 0, 255, 0],
-                                                [0, 0, 255, 0],
-                                                [0, 0, 255, 0]), dtype='uint8')
-            elif num == '8':
-                num_fld.field = np.array(([255, 255, 255, 0],
-                                          [255, 0, 255, 0],
-                                          [255, 255, 255, 0],
-                                          [255, 0, 255, 0],
-                                          [255, 255, 255, 0]), dtype='uint8')
-            elif num == '9':
-                num_fld.field[::-1] = np.array(([255, 255, 255, 0],
-                                                [255, 0, 255, 0],
-                                                [255, 255, 255, 0],
-                                                [0, 0, 255, 0],
-                                                [0, 0, 255, 0]), dtype='uint8')
-            else:
-                print('wrong number')
-                raise Exception
-
-            self.fld += num_fld
+        self.fld.field[:] = number_field(number)
 
     def get_numbers(self):
         return self.fld
@@ -1,13 +1,15 @@
-from math import sin, cos, pi, radians, log2
 from Fields import *
 from Points import *
+from Rasters import *
 from scipy.spatial.transform import Rotation
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
 
 class Figure:
     """
     name: str           Figure name, used to filename in saving
-    points: list        List of figure points (y, x)
+    points: list        List of figure points (y, x), (N, 2) array or PointSet of them
     img_fld: ArtField   Figure field container
     fig_img: np.array   ArtField field container
     opacity: int        Opacity of figure visualization
@@ -18,6 +20,13 @@ class Figure:
     density: int        Density of figure visualization
     thick: int          Thick of figure lines
     closed: bool        Is figure closed on not
+    gaps: list          Indices of points that aren't connected with next point
+    draw: bool          Is figure drawn on own field, figures for Scene may skip it, True by default
+    fill: bool          Is inside of figure filled, figure is filled as closed polygon, False by default
+    rule: str           Fill rule of self-intersecting figures, one of FILL_RULES, 'evenodd' by default
+    viewport: tuple     Visible box (y0, y1, x0, x1), bounds are included, figure is clipped by it before drawing
+    offset: tuple       Position of (min_y, min_x) point on figure field
+    memmap: str         Path of file that backs figure field on disk, field is kept in memory if empty
     """
 
     def __init__(self,
@@ -25,11 +34,23 @@ class Figure:
                  opacity: int = 100,
                  thick: int = 0,
                  name: str = 'lastfig',
-                 closed=True):
+                 closed=True,
+                 gaps=(),
+                 draw: bool = True,
+                 fill: bool = False,
+                 rule: str = 'evenodd',
+                 viewport: tuple = None,
+                 memmap: str = ''):
         self.name = name
         self.points = points_list
         self.closed = closed
+        self.gaps = gaps
+        self.fill = fill
+        self.rule = rule
+        self.viewport = viewport
+        self.memmap = memmap
         self.thick = max(0, thick)
+        self.offset = (self.thick, self.thick)
         self.opacity = max(0, opacity) if opacity < 100 else 100
         self.density = round(255 * self.opacity / 100)
         self.img_msk = None
@@ -39,17 +60,37 @@ class Figure:
             self.img_fld = ArtField()
 
         else:
-            self.max_x = max([x for _, x in self.points])
-            self.max_y = max([y for y, _ in self.points])
-            self.min_x = min([x for _, x in self.points])
-            self.min_y = min([y for y, _ in self.points])
-            self.points = [(y - self.min_y, x - self.min_x) for y, x in self.points]
+            pts = np.asarray(self.points, dtype='int64').reshape(-1, 2)
+            self.min_y, self.min_x = (int(v) for v in pts.min(axis=0))
+            self.max_y, self.max_x = (int(v) for v in pts.max(axis=0))
+            # Array of points is kept as array
+            if isinstance(self.points, np.ndarray):
+                self.points = pts - (self.min_y, self.min_x)
+
+            elif isinstance(self.points, PointSet):
+                self.points = self.points.translate(-self.min_y, -self.min_x)
+
+            else:
+                self.points = [(y - self.min_y, x - self.min_x) for y, x in self.points]
             self.dy = self.max_y - self.min_y
             self.dx = self.max_x - self.min_x
-            self.img_fld = ArtField(x=self.dx + 2 * self.thick + 1,
-                                    y=self.dy + 2 * self.thick + 1,
-                                    x0=self.min_x - self.thick,
-                                    y0=self.min_y - self.thick)
+            if not draw:
+                self.img_fld = ArtField()
+                return
+
+            y0, y1 = self.min_y - self.thick, self.max_y + self.thick
+            x0, x1 = self.min_x - self.thick, self.max_x + self.thick
+            # Field covers only visible part of figure
+            if self.viewport is not None:
+                y0, y1 = max(y0, self.viewport[0]), min(y1, self.viewport[1])
+                x0, x1 = max(x0, self.viewport[2]), min(x1, self.viewport[3])
+                if y0 > y1 or x0 > x1:
+                    print(f'Figure {self.name} is out of viewport')
+                    self.img_fld = ArtField()
+                    return
+
+            self.offset = (self.min_y - y0, self.min_x - x0)
+            self.img_fld = ArtField(x=x1 - x0 + 1, y=y1 - y0 + 1, x0=x0, y0=y0, memmap=self.memmap)
             self.draw_lines()
 
             if self.max_y < 0 and self.max_x < 0:
@@ -62,86 +103,54 @@ class Figure:
         return self.img_fld
 
     def draw_dot(self, point):
-        y0, x0 = point[0] + self.thick, point[1] + self.thick
-        self.img_msk[y0, x0] = True
+        self.draw_dots(np.array([point[0]]), np.array([point[1]]))
 
-        if self.thick > 0:
-            for x in range(self.thick + 1):
-                y = (round(sqrt(self.thick ** 2 - x ** 2)))
-                self.img_msk[y0 - y: y0 + y + 1, x0 + x] = True
-                self.img_msk[y0 - y: y0 + y + 1, x0 - x] = True
+    def draw_dots(self, ys, xs):
+        self.img_msk.add(ys + self.offset[0], xs + self.offset[1], brush_stamp('disc', self.thick))
 
     def draw_crest(self, point):
-        y0, x0 = point[0] + self.thick, point[1] + self.thick
-
-        if self.thick > 0:
-            self.img_msk[y0 - self.thick: y0 + self.thick + 1, x0] = True
-            self.img_msk[y0, x0 - self.thick: x0 + self.thick + 1] = True
-
-        else:
-            self.img_msk[y0, x0] = True
+        self.draw_crests(np.array([point[0]]), np.array([point[1]]))
+
+    def draw_crests(self, ys, xs):
+        self.img_msk.add(ys + self.offset[0], xs + self.offset[1], brush_stamp('crest', self.thick))
+
+    def strokes(self):
+        # Segments (starts, ends) drawn by crest and dots drawn by disc, in figure coordinates
+        dots = np.asarray(self.points, dtype='int64').reshape(-1, 2)
+        if len(dots) < 2:
+            return np.zeros(shape=(0, 2), dtype='int64'), np.zeros(shape=(0, 2), dtype='int64'), dots
+        return (*polyline_segments(dots, closed=self.closed, gaps=self.gaps), dots)
+
+    def fill_block(self, box):
+        # Filled inside clipped by box (y0, y1, x0, x1) in figure coordinates as (y0, x0, block), None if not filled
+        dots = np.asarray(self.points, dtype='int64').reshape(-1, 2)
+        y0, y1, x0, x1 = max(box[0], 0), min(box[1], self.dy), max(box[2], 0), min(box[3], self.dx)
+        if not self.fill or len(dots) < 3 or y0 > y1 or x0 > x1:
+            return None
+        return y0, x0, polygon_fill(dots - (y0, x0), (y1 - y0 + 1, x1 - x0 + 1), self.rule)
 
     def draw_lines(self):
-        self.img_msk = np.full(shape=self.img_fld.field.shape, fill_value=False, dtype='bool')
-
-        if len(self.points) > 2:
-
-            if self.closed:
-                for i in range(len(self.points)):
-                    self.draw_line(self.points[i-1], self.points[i])
-
-            else:
-                for i in range(len(self.points)-1):
-                    self.draw_line(self.points[i], self.points[i+1])
-
-        elif len(self.points) == 2:
-            self.draw_line(self.points[0], self.points[1])
-
-        else:
-            self.draw_dot(self.points[0])
-        self.img_fld.field[self.img_msk == True] = self.density
+        self.img_msk = SparseMask(self.img_fld.field.shape)
+        height, width = self.img_fld.field.shape
+        field_box = (-self.offset[0], height - 1 - self.offset[0], -self.offset[1], width - 1 - self.offset[1])
+        starts, ends, dots = self.strokes()
+        box = None
+        # Segment pixels are generated only where their brush touches field
+        if self.viewport is not None:
+            box = (field_box[0] - self.thick, field_box[1] + self.thick,
+                   field_box[2] - self.thick, field_box[3] + self.thick)
+        self.draw_crests(*segments_pts(starts, ends, box=box))
+        self.draw_dots(dots[:, 0], dots[:, 1])
+
+        block = self.fill_block(field_box)
+        if block is not None:
+            self.img_msk.add_block(block[0] + self.offset[0], block[1] + self.offset[1], block[2])
+        self.img_msk.write(self.img_fld.field, self.density)
 
     def draw_line(self, point0, point1):
-        y0, x0 = point0
         self.draw_dot(point0)
-        y1, x1 = point1
         self.draw_dot(point1)
-        dx = x1 - x0
-        dy = y1 - y0
-
-        if (dx == 0) and (dy != 0):
-            sdy = np.sign(dy)
-            for _ in range(abs(dy)):
-                self.draw_crest((y0, x0))
-                y0 += sdy
-
-        elif (dy == 0) and (dx != 0):
-            sdx = np.sign(dx)
-            for _ in range(abs(dx)):
-                self.draw_crest((y0, x0))
-                x0 += sdx
-
-        elif (dy != 0) and (dx != 0):
-            x_list = [x / abs(dx) for x in range(abs(dx), 0, -1)]
-            y_list = [y / abs(dy) for y in range(abs(dy), 0, -1)]
-            all_list = list(set(x_list + y_list))
-            all_list.sort()
-            sdy = np.sign(dy)
-            sdx = np.sign(dx)
-
-            for shift in all_list:
-                if (shift in x_list) and (shift in y_list):
-                    self.draw_crest((y0, x0))
-                    x0 += sdx
-                    y0 += sdy
-
-                elif shift in x_list:
-                    self.draw_crest((y0, x0))
-                    x0 += sdx
-
-                elif shift in y_list:
-                    self.draw_crest((y0, x0))
-                    y0 += sdy
+        self.draw_crests(*line_pts(point0, point1))
 
 
 class SymFigure(Figure):
@@ -160,56 +169,359 @@ class SymFigure(Figure):
                  shift_degree: int = 0,
                  mode: str = 'xy0',
                  first_point: tuple = (0, 0),
-                 name: str = 'lastfig'):
+                 name: str = 'lastfig',
+                 draw: bool = True,
+                 fill: bool = False,
+                 rule: str = 'evenodd',
+                 memmap: str = ''):
 
         if corners < 3 or side_len < 1:
             print(f"Can't create figure with those params in {self.name}")
             self.img_fld = ArtField()
             return
 
-        rot_deg = round(360 / corners)
-        radius_out = round(side_len / (2 * sin(pi / corners)))
-        points_list = []
-
-        if mode == 'xy0':
-            point_list = []
-            mid_y, mid_x = first_point[0] + radius_out, first_point[1] + radius_out
-            x_list = []
-            y_list = []
-            for i in range(corners):
-                point = (int(mid_y + radius_out * cos(radians(shift_degree + i * rot_deg))),
-                         int(mid_x + radius_out * sin(radians(shift_degree + i * rot_deg))))
-                point_list.append(point)
-                y_list.append(point[0])
-                x_list.append(point[1])
-            dy = min(y_list) - first_point[0]
-            dx = min(x_list) - first_point[1]
-            for point in point_list:
-                pnt = (point[0] - dy, point[1] - dx)
-                points_list.append(pnt)
-
-        elif mode == 'mid':
-            mid_y, mid_x = first_point
-            for i in range(corners):
-                point = (int(mid_y + radius_out * cos(radians(shift_degree + i * rot_deg))),
-                         int(mid_x + radius_out * sin(radians(shift_degree + i * rot_deg))))
-                points_list.append(point)
-
-        elif mode == 'fp':
-            mid_y = first_point[0] - round(radius_out * cos(radians(shift_degree)))
-            mid_x = first_point[1] - round(radius_out * sin(radians(shift_degree)))
-            points_list.append(first_point)
-            for i in range(1, corners):
-                point = (int(mid_y + radius_out * cos(radians(shift_degree + i * rot_deg))),
-                         int(mid_x + radius_out * sin(radians(shift_degree + i * rot_deg))))
-                points_list.append(point)
-
-        else:
+        if mode not in SYM_MODES:
             print(f'Invalid "mode" parameter in {self.name}')
             self.img_fld = ArtField()
             return
 
-        super().__init__(points_list=points_list, opacity=opacity, thick=thick, name=name)
+        points_list = PointSet(sym_pts(corners, side_len, shift_degree, first_point, mode)[0])
+        super().__init__(points_list=points_list, opacity=opacity, thick=thick, name=name, draw=draw, fill=fill,
+                         rule=rule, memmap=memmap)
+
+
+class Ellipse(Figure):
+    """
+    Ellipse drawn by pixels of integer midpoint rule, arc of it if start and end don't cover whole turn.
+    Degrees are counted from Y axis to X axis like turns of SymFigure
+    ry: int             Radius by Y axis
+    rx: int             Radius by X axis
+    center: tuple       Center point (y, x)
+    start: float        Degree of arc start
+    end: float          Degree of arc end
+    fill: bool          Is inside of ellipse or sector of arc filled
+    outline: tuple      Outline pixels (ys, xs) relative to center
+    """
+
+    def __init__(self,
+                 ry: int = 10,
+                 rx: int = 10,
+                 center: tuple = (0, 0),
+                 start: float = 0,
+                 end: float = 360,
+                 fill: bool = False,
+                 opacity: int = 100,
+                 thick: int = 0,
+                 name: str = 'ellipse',
+                 draw: bool = True,
+                 memmap: str = ''):
+        if ry < 0 or rx < 0:
+            print(f"Can't create ellipse with negative radius in {name}")
+            self.img_fld = ArtField()
+            return
+
+        self.ry, self.rx = ry, rx
+        self.center = center
+        self.start, self.end = start, end
+        self.arc = end - start < 360
+        ys, xs = ellipse_pts(ry, rx)
+        if self.arc:
+            angles = pixel_angles(ys, xs)
+            keep = in_arc(angles, start, end)
+            order = np.argsort((angles[keep] - start) % 360, kind='stable')
+            ys, xs = ys[keep][order], xs[keep][order]
+        self.outline = ys, xs
+        points = np.stack((ys, xs), axis=1)
+        # Filled sector includes its center
+        if self.arc and fill:
+            points = np.concatenate((points, [(0, 0)]))
+        super().__init__(points_list=PointSet(points + center),
+                         opacity=opacity,
+                         thick=thick,
+                         name=name,
+                         closed=not self.arc or fill,
+                         draw=draw,
+                         fill=fill,
+                         memmap=memmap)
+
+    def strokes(self):
+        # Outline pixels are drawn as dots, not as segments
+        cy, cx = self.center[0] - self.min_y, self.center[1] - self.min_x
+        dots = np.stack((self.outline[0] + cy, self.outline[1] + cx), axis=1).astype('int64')
+        return np.zeros(shape=(0, 2), dtype='int64'), np.zeros(shape=(0, 2), dtype='int64'), dots
+
+    def fill_block(self, box):
+        # Block of whole ellipse, its parts out of box are clipped by mask
+        if not self.fill:
+            return None
+
+        block = ellipse_fill(self.ry, self.rx)
+        if self.arc:
+            ys, xs = np.indices(block.shape) - np.array((self.ry, self.rx))[:, None, None]
+            block &= in_arc(pixel_angles(ys, xs), self.start, self.end)
+        return self.center[0] - self.min_y - self.ry, self.center[1] - self.min_x - self.rx, block
+
+
+class Circle(Ellipse):
+    """
+    r: int              Radius of circle
+    """
+
+    def __init__(self,
+                 r: int = 10,
+                 center: tuple = (0, 0),
+                 fill: bool = False,
+                 opacity: int = 100,
+                 thick: int = 0,
+                 name: str = 'circle',
+                 draw: bool = True,
+                 memmap: str = ''):
+        super().__init__(ry=r, rx=r, center=center, fill=fill, opacity=opacity, thick=thick, name=name, draw=draw,
+                         memmap=memmap)
+
+
+class Arc(Ellipse):
+    """
+    Arc of circle from start to end degree, sector if filled
+    r: int              Radius of circle
+    """
+
+    def __init__(self,
+                 r: int = 10,
+                 start: float = 0,
+                 end: float = 90,
+                 center: tuple = (0, 0),
+                 fill: bool = False,
+                 opacity: int = 100,
+                 thick: int = 0,
+                 name: str = 'arc',
+                 draw: bool = True,
+                 memmap: str = ''):
+        super().__init__(ry=r, rx=r, center=center, start=start, end=end, fill=fill, opacity=opacity, thick=thick,
+                         name=name, draw=draw, memmap=memmap)
+
+
+class Scene:
+    """
+    Shared field that figures are rasterized into together.
+    Figures are queued by add and drawn by one batched pass per opacity, figures of one opacity are merged
+    as one layer, so they don't add up where they overlap
+    img_fld: ArtField   Scene field container
+    mode: str           Blend mode of opacity layers, one of BLEND_MODES
+    name: str           Scene name, used to filename in saving
+    queue: dict         Segments, vertices and fill blocks of queued figures grouped by density and thick
+    """
+
+    def __init__(self,
+                 y: int = 1,
+                 x: int = 1,
+                 y0: int = 0,
+                 x0: int = 0,
+                 mode: str = 'add',
+                 name: str = 'scene',
+                 memmap: str = ''):
+        if mode not in BLEND_MODES:
+            print(f'Unknown blend mode {mode}, use one of {BLEND_MODES}')
+            raise Exception
+
+        self.img_fld = ArtField(y=y, x=x, y0=y0, x0=x0, memmap=memmap)
+        self.mode = mode
+        self.name = name
+        self.queue = {}
+
+    def add(self, *figures):
+        # Figures created with draw=False are enough, only their strokes, fill and style are used.
+        # Figures with own field origin, viewport or drawing aren't described by strokes and can't be queued
+        for fig in figures:
+            if (not isinstance(fig, Figure) or isinstance(fig, (AniFig, FunFig))
+                    or type(fig).draw_lines is not Figure.draw_lines or getattr(fig, 'viewport', None) is not None):
+                print(f"{type(fig).__name__} can't be drawn on scene {self.name}")
+                raise Exception
+
+            if len(fig.points) == 0:
+                continue
+
+            shift = (fig.min_y - self.img_fld.y0, fig.min_x - self.img_fld.x0)
+            starts, ends, dots = fig.strokes()
+            self.queue_lines(starts + shift, ends + shift, dots + shift, fig.density, fig.thick)
+            # Fill is clipped by scene field, so block isn't bigger than field
+            height, width = self.img_fld.field.shape
+            block = fig.fill_block((-shift[0], height - 1 - shift[0], -shift[1], width - 1 - shift[1]))
+            if block is not None:
+                self.queue[(fig.density, fig.thick)][3].append((block[0] + shift[0], block[1] + shift[1], block[2]))
+        return self
+
+    def add_polygons(self,
+                     corners,
+                     side_lens,
+                     shift_degrees=0,
+                     first_points=(0, 0),
+                     mode: str = 'xy0',
+                     opacity: int = 100,
+                     thick: int = 0):
+        """
+        Queues N regular polygons like SymFigure ones without creating figures, params are arrays
+        with value for every polygon or single value for all of them
+        """
+        side_lens = np.asarray(side_lens, dtype='int64').reshape(-1)
+        corners = np.broadcast_to(np.asarray(corners, dtype='int64').reshape(-1), side_lens.shape)
+        shifts = np.broadcast_to(np.asarray(shift_degrees, dtype='int64').reshape(-1), side_lens.shape)
+        fps = np.broadcast_to(np.asarray(first_points, dtype='int64').reshape(-1, 2), (len(side_lens), 2))
+        valid = (corners >= 3) & (side_lens >= 1)
+        if not valid.all():
+            print(f"Can't create {np.count_nonzero(~valid)} polygons with those params in {self.name}")
+
+        thick = max(0, thick)
+        density = round(255 * (max(0, opacity) if opacity < 100 else 100) / 100)
+        shift = (self.img_fld.y0, self.img_fld.x0)
+        for n in np.unique(corners[valid]):
+            group = valid & (corners == n)
+            pts = sym_pts(int(n), side_lens[group], shifts[group], fps[group], mode) - shift
+            # Every polygon is closed, so segment ends are its vertices
+            self.queue_lines(np.roll(pts, 1, axis=1).reshape(-1, 2), pts.reshape(-1, 2), pts.reshape(-1, 2),
+                             density, thick)
+        return self
+
+    def queue_lines(self, starts, ends, dots, density: int, thick: int):
+        group = self.queue.setdefault((density, thick), ([], [], [], []))
+        group[0].append(starts)
+        group[1].append(ends)
+        group[2].append(dots)
+
+    def draw(self):
+        if not self.queue:
+            return self.img_fld
+
+        # Masks are blended straight into pixels they cover, max of field is kept as limit of sums
+        field = self.img_fld.field
+        flat = field.reshape(-1)
+        top = int(field.max(initial=0))
+        for density in sorted({density for density, thick in self.queue if density > 0}):
+            msk = SparseMask(field.shape)
+            for thick in sorted(thick for dens, thick in self.queue if dens == density):
+                starts, ends, dots = (np.concatenate(part) for part in self.queue[(density, thick)][:3])
+                msk.add(*segments_pts(starts, ends), brush_stamp('crest', thick))
+                msk.add(dots[:, 0], dots[:, 1], brush_stamp('disc', thick))
+                for y0, x0, block in self.queue[(density, thick)][3]:
+                    msk.add_block(y0, x0, block)
+            ind = msk.indices()
+            pixels = blend(flat[ind], density, mode=self.mode, top=top)
+            flat[ind] = pixels
+            top = max(top, int(pixels.max(initial=0)))
+        self.queue = {}
+        return self.img_fld
+
+    def get_field(self):
+        return self.draw()
+
+    def save_scene(self):
+        self.draw().save_field(f'{self.name}.png')
+
+
+class Axes:
+    """
+    Axis lines with notches and value labels drawn around plot.
+    Notches are placed on round values, at least min_step pixels apart
+    plot: np.array      Plot field container
+    x0: int             X pixel coordinate of first plot column
+    y0: int             Y pixel coordinate of first plot row
+    x_range: tuple      Pixel coordinates range of notches on X axis
+    y_range: tuple      Pixel coordinates range of notches on Y axis
+    scaling: float      Number of pixels in value unit
+    size: int           Size multiplier of labels
+    min_step: int       Min distance between notches in pixels
+    fld: ArtField       Container of axes with plot
+    plot_y0: int        Row of plot origin in fld
+    plot_x0: int        Column of plot origin in fld
+    """
+    notch_len = 3
+    inside_indent = 4
+
+    def __init__(self,
+                 plot,
+                 x0: int = 0,
+                 y0: int = 0,
+                 x_range: tuple = (),
+                 y_range: tuple = (),
+                 scaling: float = 1,
+                 size: int = 1,
+                 min_step: int = 20,
+                 opacity: int = 100):
+        self.x0 = x0
+        self.y0 = y0
+        self.x_range = x_range if len(x_range) == 2 else (x0, x0 + plot.shape[1] - 1)
+        self.y_range = y_range if len(y_range) == 2 else (y0, y0 + plot.shape[0] - 1)
+        self.scaling = scaling
+        self.size = max(1, size)
+        self.min_step = min_step
+        self.density = round(255 * (max(0, opacity) if opacity < 100 else 100) / 100)
+        # Every size is calculated before drawing, so canvas is allocated once
+        lbl_hei, lbl_wid = font_atlas(self.size).shape[1:]
+        x_ticks, x_texts = self.ticks(*self.x_range)
+        y_ticks, y_texts = self.ticks(*self.y_range)
+        x_wid = np.array([len(text) for text in x_texts]) * lbl_wid
+        y_wid = np.array([len(text) for text in y_texts]) * lbl_wid
+        # Position of axis lines
+        axis_row = lbl_hei + self.notch_len + 1
+        axis_col = y_wid.max(initial=0) + self.notch_len
+        self.plot_y0 = axis_row + 1 + self.inside_indent
+        self.plot_x0 = axis_col + 1 + self.inside_indent
+        # Centered X labels must fit field from both sides
+        x_cols = self.plot_x0 + x_ticks - self.x0
+        shift = max(0, (x_wid // 2 - x_cols).max(initial=0))
+        axis_col += shift
+        self.plot_x0 += shift
+        x_cols += shift
+        right = max(0, (x_cols + x_wid - x_wid // 2 - self.plot_x0 - plot.shape[1]).max(initial=0))
+        self.fld = ArtField(y=self.plot_y0 + plot.shape[0] + lbl_hei // 2 + 1,
+                            x=self.plot_x0 + plot.shape[1] + right)
+        field = self.fld.field
+        field[self.plot_y0:self.plot_y0 + plot.shape[0], self.plot_x0:self.plot_x0 + plot.shape[1]] = plot
+        # Axis lines and all notches of axis are drawn by one write
+        y_rows = self.plot_y0 + y_ticks - self.y0
+        field[axis_row:self.plot_y0 + plot.shape[0], axis_col] = self.density
+        field[axis_row, axis_col:self.plot_x0 + plot.shape[1]] = self.density
+        field[np.arange(axis_row - self.notch_len, axis_row)[:, None], x_cols] = self.density
+        field[y_rows[:, None], np.arange(axis_col - self.notch_len, axis_col)] = self.density
+        # X labels are centered under notches, Y labels are aligned to notches from the left
+        draw_labels(field,
+                    x_texts + y_texts,
+                    ys=np.concatenate((np.zeros(len(x_texts), dtype='int64'), y_rows - lbl_hei // 2)),
+                    xs=np.concatenate((x_cols - x_wid // 2, axis_col - self.notch_len - y_wid)),
+                    size=self.size,
+                    density=self.density)
+
+    def ticks(self, start: int, stop: int):
+        # Pixel positions and labels of round values notches in [start, stop] range
+        raw_step = self.min_step
+        for _ in range(2):
+            step = nice_step(raw_step / self.scaling)
+            values = np.arange(np.ceil(start / self.scaling / step), np.floor(stop / self.scaling / step) + 1) * step
+            if len(values) < 2:
+                values = np.unique(np.array((start, stop)) / self.scaling)
+                step = nice_step(max(np.ptp(values), 1 / self.scaling) / 10)
+            texts = [tick_text(value, step) for value in values]
+            # Notches are moved apart if labels are too wide
+            lbl_len = max(len(text) for text in texts) * font_atlas(self.size).shape[2] + font_atlas(self.size).shape[2]
+            if lbl_len <= raw_step:
+                break
+            raw_step = lbl_len
+        return np.rint(values * self.scaling).astype('int64'), texts
+
+
+def nice_step(raw: float):
+    # The least of 1, 2, 5 multiplied by power of 10 that isn't less than raw
+    power = 10.0 ** np.floor(np.log10(raw))
+    return next(m * power for m in (1, 2, 5, 10) if m * power >= raw * (1 - 1e-9))
+
+
+def tick_text(value: float, step: float):
+    if value == 0:
+        return '0'
+
+    if abs(value) >= 1e5 or abs(value) < 1e-3:
+        return f'{value:.{max(0, int(np.floor(np.log10(abs(value)))) - int(np.floor(np.log10(step))))}e}'
+    return f'{value:.{max(0, -int(np.floor(np.log10(step))))}f}'
 
 
 class FunFig(Figure):
@@ -222,6 +534,8 @@ class FunFig(Figure):
     scaling: float  Scaling multiplicator in visualization, 1 by default
     x0: int         Origin of X field axis, used in figure placing on field, 0 by default
     y0: int         Origin of Y field axis, used in figure placing on field, 0 by default
+    vectorized: bool    Is f called once with array of all X values, falls back to calls by one X, True by default
+    adaptive: bool  Is f sampled densely only where graph bends, with gaps on discontinuities, False by default
     """
 
     def __init__(self,
@@ -234,7 +548,9 @@ class FunFig(Figure):
                  thick: int = 0,
                  x0: int = 0,
                  y0: int = 0,
-                 opacity: int = 100):
+                 opacity: int = 100,
+                 vectorized: bool = True,
+                 adaptive: bool = False):
 
         if (len(x_range) != 2) or (type(x_range[0]) != int) or (type(x_range[1]) != int):
             print('Invalid format of x_range value')
@@ -243,147 +559,98 @@ class FunFig(Figure):
         if x_range[0] > x_range[1]:
             x_range = x_range[::-1]
         # Calculating figure points
-        points_list = []
+        if adaptive:
+            points_list, gaps = adaptive_fun_pts(f, x_range, scaling=scaling, vectorized=vectorized)
 
-        for x in np.arange(x_range[0], x_range[1], 1/scaling):
-            y = f(x)
-            points_list.append((round(y*scaling), round(x*scaling)))
+        else:
+            points_list, gaps = fun_pts(f, np.arange(x_range[0], x_range[1], 1/scaling),
+                                        scaling=scaling, vectorized=vectorized)
 
-        super().__init__(points_list=points_list, closed=False, thick=thick, opacity=opacity, name=name)
-        self.img_fld.y0, self.img_fld.x0 = y0, x0
-        # Cutting figure by y_range and x_range
+        points_list = np.asarray(points_list, dtype='int64').reshape(-1, 2)
+        thick = max(0, thick)
+        viewport = None
+        # Figure is clipped by y_range and drawn only in it
         if len(y_range) == 1:
             y_range = (y_range[0], y_range[0])
 
-        if len(y_range) == 2:
+        if len(y_range) == 2 and len(points_list):
             if y_range[1] < y_range[0]:
                 y_range = y_range[::-1]
-            y_range = (y_range[0]*scaling, y_range[1]*scaling)
+            y_range = (int(np.ceil(y_range[0]*scaling)), int(np.floor(y_range[1]*scaling)))
+            min_y, min_x = (int(v) for v in points_list.min(axis=0))
+            max_y, max_x = (int(v) for v in points_list.max(axis=0))
 
-            if y_range[1] < self.min_y or y_range[0] > self.max_y:
+            if y_range[1] < min_y or y_range[0] > max_y:
                 self.img_fld = ArtField()
                 print('Chosen y range out of function area')
                 return
 
-            # Cutting in range by Y axis
-            cut_y_ind, cut_x_ind = np.where(self.img_fld.field != 0)
-            self.y0 = max(y_range[0] - self.min_y, 0)
-            self.y1 = min(max(y_range[1] - self.min_y, 0), max(cut_y_ind) - self.thick)
-            self.img_fld.field = self.img_fld.field[self.y0:self.y1 + 1]
-            # Cutting white poles by X axis
-            self.x0 = min(cut_x_ind) + self.thick
-            self.x1 = max(cut_x_ind) - self.thick
-            self.img_fld.field = self.img_fld.field[:, self.x0:self.x1 + 1]
-
-        elif len(y_range) == 0:
+            # Rows in range by Y axis and columns of points without white poles, counted from figure field corner
+            self.y0 = max(y_range[0] - min_y, 0)
+            self.y1 = min(max(y_range[1] - min_y, 0), max_y - min_y + thick)
+            self.x0 = thick
+            self.x1 = max_x - min_x + thick
+            viewport = (self.y0 + min_y - thick, self.y1 + min_y - thick, min_x, max_x)
+            # Points far out of viewport are clamped, segments to them stay steep enough
+            # to cross viewport by the same pixels, and their values fit into PointSet
+            steep = int(np.abs(np.diff(points_list[:, 1])).max(initial=0)) + 1
+            margin = max((viewport[1] - viewport[0] + 2 * thick + 2) * steep, 1 << 24)
+            points_list[:, 0] = np.clip(points_list[:, 0], viewport[0] - margin, viewport[1] + margin)
+
+        elif len(y_range) > 2:
+            print(f'Invalid y_range format in {name}')
+            self.img_fld = ArtField()
+            return
+
+        super().__init__(points_list=PointSet(points_list), closed=False, thick=thick, opacity=opacity, name=name,
+                         gaps=gaps, viewport=viewport)
+        self.img_fld.y0, self.img_fld.x0 = y0, x0
+
+        if viewport is not None:
+            # Min of clamped points may differ, rows are counted from field corner of them
+            self.y0 = viewport[0] - self.min_y + thick
+            self.y1 = viewport[1] - self.min_y + thick
+
+        if len(y_range) == 0:
             cut_y_ind, cut_x_ind = np.where(self.img_fld.field != 0)
             self.y0 = min(cut_y_ind)
             self.y1 = max(cut_y_ind) - 2 * self.thick
             self.x0 = min(cut_x_ind)
             self.x1 = max(cut_x_ind) - 2 * self.thick
 
-        else:
-            print(f'Invalid y_range format in {self.name}')
-            self.img_fld = ArtField()
-            return
-
         if spec:
-            num_len = 4
-            num_hei = 5
-            inside_indent = 4
-            spec_opacity = 1
-            notch_len = 3
             self.y0 += self.min_y
             self.y1 += self.min_y
             self.x0 += self.min_x
             self.x1 += self.min_x
-            num_len_y0 = len(str(round(self.y0 / scaling)))
-            num_len_y1 = len(str(round(self.y1 / scaling)))
-            max_y_len = max(num_len_y0, num_len_y1)
-            num_len_x0 = len(str(round(self.x0 / scaling)))
-            num_len_x1 = len(str(round(self.x1 / scaling)))
-            max_x_len = max(num_len_x0, num_len_x1) * num_len
-            # x indent for X axis line from bottom of fld
-            outside_x_indent = num_hei + notch_len + 1
-            # y indent for Y axis line from left of fld
-            outside_y_indent = max_y_len * num_len + notch_len
-            total_x_indent = inside_indent + spec_opacity + outside_x_indent
-            total_y_indent = inside_indent + spec_opacity + outside_y_indent
-            # Expanding field
-            tmp = np.zeros(shape=(total_x_indent + outside_x_indent + self.img_fld.field.shape[0],
-                                  total_y_indent + outside_y_indent + self.img_fld.field.shape[1] + max_x_len * 2),
-                           dtype='uint16')
-            tmp[total_x_indent:- outside_x_indent,
-                total_y_indent + max_x_len:-outside_y_indent - max_x_len] = self.img_fld.field
-            self.img_fld.field = tmp
-            # Draw specification axis lines
-            self.img_fld.field[outside_x_indent:, outside_y_indent] = 255
-            self.img_fld.field[outside_x_indent, outside_y_indent:] = 255
-            # Adding notches on axis lines by X axis
-            dx = self.x1 - self.x0
-            self.img_fld.field[outside_x_indent - notch_len:outside_x_indent,
-                               total_y_indent + max_x_len + self.thick] = 255
-            self.img_fld.field[outside_x_indent - notch_len:outside_x_indent,
-                               total_y_indent + max_x_len + self.thick + dx] = 255
-            # Drawn numbers that too close to each other
-            if dx < max_x_len and dx != 0:
-                num_art = Number(number=str(round(self.x0/scaling)), x0=total_y_indent + self.thick)
-                self.img_fld += num_art.get_numbers()
-                num_art = Number(number=str(round(self.x1/scaling)), x0=total_y_indent + self.thick + max_x_len + dx)
-                self.img_fld += num_art.get_numbers()
-            # Drawn numbers with normal split
-            else:
-                num_art = Number(number=str(round(self.x0/scaling)),
-                                 x0=total_y_indent - int(num_len_x0 * num_len / 2) + max_x_len + self.thick)
-                self.img_fld += num_art.get_numbers()
-                num_art = Number(number=str(round(self.x1/scaling)),
-                                 x0=total_y_indent - int(num_len_x1 * num_len / 2) + max_x_len + self.thick + dx)
-                self.img_fld += num_art.get_numbers()
-                step = 20 * max(1, round(max_x_len / num_len) - 3)
-                start_num = self.x0 + (abs(self.x0) % step) + step
-                stop_num = self.x1 - (abs(self.x1) % step) + 1
-
-                for num in range(start_num, stop_num, step):
-                    self.img_fld.field[outside_x_indent - notch_len:outside_x_indent,
-                                       total_y_indent + num + max_x_len - self.x0 + self.thick] = 255
-                    num_art = Number(number=str(round(num/scaling)),
-                                     x0=total_y_indent-int((len(str(num))*num_len)/3)+num-self.x0+max_x_len+self.thick)
-                    self.img_fld += num_art.get_numbers()
-            # Adding notches on axis lines by Y axis
-            dy = self.y1 - self.y0
-            self.img_fld.field[total_x_indent + self.thick, outside_y_indent - notch_len: outside_y_indent] = 255
-            self.img_fld.field[total_x_indent + self.thick + dy, outside_y_indent - notch_len: outside_y_indent] = 255
-            # Drawn numbers that too close to each other
-            if dy < num_hei and dy != 0:
-                num_art = Number(number=str(round(self.y0/scaling)),
-                                 x0=outside_y_indent - notch_len - num_len_y0 * num_len,
-                                 y0=total_x_indent - num_hei + self.thick)
-                self.img_fld += num_art.get_numbers()
-                num_art = Number(number=str(round(self.y1/scaling)),
-                                 x0=outside_y_indent - notch_len - num_len_y1 * num_len,
-                                 y0=total_x_indent + dy + self.thick)
-                self.img_fld += num_art.get_numbers()
-            # Drawn numbers with normal split
-            else:
-                num_art = Number(number=str(round(self.y0/scaling)),
-                                 x0=outside_y_indent - notch_len - num_len_y0 * num_len,
-                                 y0=total_x_indent - round(num_hei/2) + self.thick)
-                self.img_fld += num_art.get_numbers()
-                num_art = Number(number=str(round(self.y1/scaling)),
-                                 x0=outside_y_indent - notch_len - num_len_y1 * num_len,
-                                 y0=total_x_indent - round(num_hei/2) + dy + self.thick)
-                self.img_fld += num_art.get_numbers()
-                step = 20 * max(1, max_y_len - 3)
-                start_num = self.y0 + (abs(self.y0) % step) + step
-                stop_num = self.y1 - (abs(self.y1) % step)
-
-                for num in range(start_num, stop_num, step):
-                    self.img_fld.field[total_x_indent + num - self.y0 + self.thick,
-                                       outside_y_indent - notch_len:outside_y_indent] = 255
-                    num_art = Number(number=str(round(num/scaling)),
-                                     x0=outside_y_indent - notch_len - len(str(round(num/scaling))) * num_len,
-                                     y0=total_x_indent + num - self.y0 - round(num_hei/2) + self.thick)
-                    self.img_fld += num_art.get_numbers()
+            self.axes = Axes(plot=self.img_fld.field,
+                             x0=self.x0 - self.thick,
+                             y0=self.y0 - self.thick,
+                             x_range=(self.x0, self.x1),
+                             y_range=(self.y0, self.y1),
+                             scaling=scaling)
+            self.img_fld.field = self.axes.fld.field
+
+
+def draw_ani_part(fig, shm_name: str, shape: tuple, dtype: str, first: int, last: int):
+    """
+    Draws frames [first, last) of AniFig into field in shared memory.
+    Frame also gets half-visible tail head from drawing of the next frame, so next frame is passed too,
+    last frame gets it from the first one before its own drawing like in one process drawing.
+    Returns dirty boxes of frames drawn by worker
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        fig.ani_fld.field = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        fig.owned = range(first, last)
+        frames = list(range(first, min(last + 1, fig.frames)))
+        if last == fig.frames and first > 0:
+            frames = [0] + frames
+        fig.draw_frames(frames)
+        return fig.ani_fld.dirty
+    finally:
+        fig.ani_fld.field = None
+        shm.close()
 
 
 class AniFig(Figure):
@@ -405,6 +672,10 @@ class AniFig(Figure):
     shadow: bool        Is figure have visible shadow along whole length
     pts_density: int    Coefficient of number of points to frames ratio
     loop_steps: int     How many times animation move around figures_pts
+    stream: bool        Are frames flushed to gif file while drawing, finished by save_figure
+    workers: int        Number of processes that draw frames, frames are drawn in this process if 1
+    dtype: str          Type of animation field values, 'uint8' halves memory
+    owned: range        Frames that are drawn by this process
     """
     def __init__(self,
                  points_list: list = (),
@@ -416,7 +687,10 @@ class AniFig(Figure):
                  frames: int = 60,
                  tail: bool = False,
                  shadow: bool = False,
-                 pts_density: int = 4):
+                 pts_density: int = 4,
+                 stream: bool = False,
+                 workers: int = 1,
+                 dtype: str = 'uint16'):
 
         if len(points_list) == 0:
             print(f'Points list is empty in {self.name}')
@@ -431,81 +705,124 @@ class AniFig(Figure):
         self.closed_anim = closed
         self.frames = frames
         self.thick = max(0, thick)
-        self.max_x = max([x for _, x in points_list])
-        self.max_y = max([y for y, _ in points_list])
-        self.min_x = min([x for _, x in points_list])
-        self.min_y = min([y for y, _ in points_list])
+        points_list = PointSet(points_list)
+        self.min_y, self.min_x, self.max_y, self.max_x = points_list.bounds()
         self.dy = self.max_y - self.min_y
         self.dx = self.max_x - self.min_x
         self.ani_fld = AnimatedField(x=self.dx + 2 * self.thick + 1,
                                      y=self.dy + 2 * self.thick + 1,
                                      x0=self.min_x - self.thick,
                                      y0=self.min_y - self.thick,
-                                     frames=self.frames)
+                                     frames=self.frames,
+                                     stream=f'{name}.gif' if stream else '',
+                                     dtype=dtype)
         self.img_fld = ArtField()
-        # Standardise points list
-        self.pts = points_list
-        num_of_pts = len(self.pts)
-
-        if num_of_pts < self.frames * self.pts_dens:
-            self.pts = double_pts(self.pts,
-                                  steps=1 + int(log2(self.frames * self.pts_dens) - int(log2(num_of_pts))),
-                                  closed=self.closed_anim)
-        self.pts = drop_n_lst(lst=self.pts, n=len(self.pts) - self.frames * self.pts_dens)
+        # Standardise points list, path is resampled to frames * pts_density points of equal spacing
+        self.pts = resample_pts(points_list, self.frames * self.pts_dens, closed=self.closed_anim)
         self.num_of_pts = len(self.pts)
         self.step = self.pts_dens * self.loop_steps
+        self.shadow_fld = None
+        self.full_fld = None
         # Creating shadow of whole figure
         if self.shadow:
             super().__init__(points_list=self.pts, opacity=int(opacity/10), thick=thick, closed=self.closed_anim)
-            for fr in range(self.frames):
-                self.ani_fld.place_art(self.img_fld, fr)
+            self.shadow_fld = self.img_fld
         # Simplified creating of figure animation in case of overlength step
         if self.step >= self.frames:
             super().__init__(points_list=self.pts, opacity=opacity, thick=thick, closed=self.closed_anim)
-            for fr in range(self.frames):
-                self.ani_fld.place_art(self.img_fld, fr)
-        # Fractured creating of figure with "Tail" option
+            self.full_fld = self.img_fld
+
+        self.owned = range(self.frames)
+        # Streamed field has only few frames in memory, so it's drawn in one process
+        if workers > 1 and not stream:
+            self.draw_parallel(workers)
+
         else:
-            for fr in range(self.frames):
-                to_frame = fr
-                self.place_ani(opac=opacity, ind=fr, to_frame=to_frame)
-                # Tail placed in step-1 position on field and with half-opacity
-                if self.tail:
-
-                    if fr == 0:
-                        fr = self.frames - 1
-
-                    else:
-                        fr -= 1
-                    self.place_ani(opac=int(opacity/2), ind=fr, to_frame=to_frame)
+            self.draw_frames(range(self.frames))
         # Almost miss this
         self.name = name
 
+    def draw_frames(self, frames):
+        # Frames are drawn one by one, so streamed field keeps only few of them
+        for fr in frames:
+            if self.shadow_fld is not None:
+                self.place_frame(self.shadow_fld, fr)
+
+            if self.full_fld is not None:
+                self.place_frame(self.full_fld, fr)
+                continue
+            # Fractured creating of figure with "Tail" option
+            to_frame = fr
+            self.place_ani(opac=self.ani_opacity, ind=fr, to_frame=to_frame)
+            # Tail placed in step-1 position on field and with half-opacity
+            if self.tail:
+
+                if fr == 0:
+                    fr = self.frames - 1
+
+                else:
+                    fr -= 1
+                self.place_ani(opac=int(self.ani_opacity/2), ind=fr, to_frame=to_frame)
+
+    def draw_parallel(self, workers: int):
+        # Workers draw their frame ranges straight into field in shared memory
+        field = self.ani_fld.field
+        parts = min(workers, self.frames)
+        bounds = np.linspace(0, self.frames, parts + 1).astype(int)
+        shm = shared_memory.SharedMemory(create=True, size=field.nbytes)
+        shared = np.ndarray(field.shape, dtype=field.dtype, buffer=shm.buf)
+        shared[:] = 0
+        self.ani_fld.field = None
+        try:
+            with ProcessPoolExecutor(max_workers=parts) as pool:
+                dirty = list(pool.map(draw_ani_part,
+                                      [self] * parts,
+                                      [shm.name] * parts,
+                                      [field.shape] * parts,
+                                      [field.dtype.str] * parts,
+                                      bounds[:-1],
+                                      bounds[1:]))
+            field[:] = shared
+            for boxes in dirty:
+                self.ani_fld.join_dirty(boxes)
+        finally:
+            self.ani_fld.field = field
+            del shared
+            shm.close()
+            shm.unlink()
+
+    def place_frame(self, fld: ArtField, frame: int):
+        if frame in self.owned:
+            self.ani_fld.place_art(fld, frame)
+
     def place_ani(self, opac: int, ind: int, to_frame: int):
         # Check is segment fractured
         def segm_check(step: int, fr: int, num_of_pts: int) -> bool:
             return (step * (fr + 1)) % num_of_pts > (step * fr) % num_of_pts
 
+        if to_frame not in self.owned and ind not in self.owned:
+            return
+
+        start, stop = (self.step * ind) % self.num_of_pts, (self.step * (ind + 1)) % self.num_of_pts + 1
         if segm_check(step=self.step, fr=ind, num_of_pts=self.num_of_pts):
-            pts = self.pts[(self.step * ind) % self.num_of_pts: ((self.step * (ind + 1)) % self.num_of_pts) + 1]
+            pts = self.pts.wrap(start, stop)
             super().__init__(points_list=pts, opacity=opac, thick=self.thick, closed=False)
-            self.ani_fld.place_art(self.img_fld, to_frame)
+            self.place_frame(self.img_fld, to_frame)
 
         else:
             if self.closed_anim:
-                pts_head = self.pts[round((self.step * ind) % self.num_of_pts):]
-                pts_tail = self.pts[:round((self.step * (ind + 1)) % self.num_of_pts) + 1]
-                pts = pts_head + pts_tail
+                # Segment through the end of closed path is taken by one wrap-around range
+                pts = self.pts.wrap(start, self.num_of_pts + stop)
                 super().__init__(points_list=pts, opacity=opac, thick=self.thick, closed=False)
-                self.ani_fld.place_art(self.img_fld, to_frame)
+                self.place_frame(self.img_fld, to_frame)
 
             else:
-                pts_head = self.pts[round((self.step * ind) % self.num_of_pts):]
+                pts_head = self.pts[start:]
                 super().__init__(points_list=pts_head, opacity=opac, thick=self.thick, closed=False)
-                self.ani_fld.place_art(self.img_fld, ind)
-                pts_tail = self.pts[:round((self.step * (ind + 1)) % self.num_of_pts) + 1]
+                self.place_frame(self.img_fld, ind)
+                pts_tail = self.pts[:stop]
                 super().__init__(points_list=pts_tail, opacity=opac, thick=self.thick, closed=False)
-                self.ani_fld.place_art(self.img_fld, to_frame)
+                self.place_frame(self.img_fld, to_frame)
 
     def get_figure(self):
         return self.ani_fld
@@ -520,14 +837,16 @@ class AniFig(Figure):
 
         # Coefficient of animation speed ratio
         def ind_coef(i):
-            return int((i * other.step / self.step) % len(other.pts))
+            return ((i * other.step / self.step) % len(other.pts)).astype('int64')
 
         if self.loop_steps == other.loop_steps:
-            result_list = [mid_pts(pts, other.pts[ind]) for ind, pts in enumerate(self.pts)]
+            pts, other_pts = np.asarray(self.pts), np.asarray(other.pts)[:len(self.pts)]
 
         else:
-            result_list = [mid_pts(pts, other.pts[ind_coef(ind)])
-                           for ind, pts in enumerate(self.pts * self.loop_steps)]
+            pts = np.asarray(self.pts * self.loop_steps)
+            other_pts = np.asarray(other.pts)[ind_coef(np.arange(len(pts)))]
+        # Midpoints are rounded like in mid_pts
+        result_list = PointSet(np.rint((pts.astype('int64') + other_pts) / 2))
 
         return AniFig(points_list=result_list,
                       opacity=max(self.ani_opacity, other.ani_opacity),
@@ -540,19 +859,151 @@ class AniFig(Figure):
                       pts_density=self.pts_dens)
 
 
-class TheCube:
+class MeshFig(Figure):
+    """
+    Wireframe of 3D mesh in orthogonal projection on (y, x) field plane, viewer looks along Z axis
+    vertices: np.array  Array (N, 3) of mesh points (x, y, z)
+    faces: np.array     Array (F, K) of faces vertices indices, counter-clockwise looking from outside of mesh
+    cull: bool          Are faces turned away from viewer hidden
+    edges: np.array     Array (E, 2) of vertices indices of drawn edges, each edge is drawn once
+    center: tuple       Position (y, x) of mesh origin on field
+    """
+
+    def __init__(self,
+                 vertices=(),
+                 faces=(),
+                 opacity: int = 100,
+                 thick: int = 0,
+                 cull: bool = True,
+                 center: tuple = (0, 0),
+                 name: str = 'mesh'):
+        self.vertices = np.asarray(vertices, dtype='float64').reshape(-1, 3)
+        self.faces = np.asarray(faces, dtype='int64')
+        self.cull = cull
+        self.center = center
+
+        if len(self.faces) == 0:
+            self.edges = np.zeros(shape=(0, 2), dtype='int64')
+
+        else:
+            # Culling of all faces at once by Z of their normals
+            visible = face_normals(self.vertices, self.faces)[:, 2] < 0 if self.cull else slice(None)
+            self.edges = mesh_edges(self.faces[visible])
+
+        if len(self.edges) == 0:
+            print(f'Mesh has no visible edges in {name}')
+            super().__init__(name=name, opacity=opacity, thick=thick)
+            return
+
+        points = np.rint(self.vertices[:, 1::-1] + center).astype('int64')
+        super().__init__(points_list=points, opacity=opacity, thick=thick, name=name)
+
+    def strokes(self):
+        # Only edges of mesh are drawn, ends of every edge are dots
+        points = np.asarray(self.points, dtype='int64').reshape(-1, 2)
+        return points[self.edges[:, 0]], points[self.edges[:, 1]], points[np.unique(self.edges)]
+
+
+class AniMesh:
+    """
+    Animation of 3D mesh wireframe rotating around origin
+    vertices: np.array  Array (N, 3) of mesh points (x, y, z) in first frame
+    faces: np.array     Array (F, K) of faces vertices indices, counter-clockwise looking from outside of mesh
+    rot: tuple          Rotating angles applied to mesh every frame (x, y, z)
+    mrot: np.array      Rotation matrix applied to mesh every frame
+    frames: int         How many frames needs to calculate
+    frame_vertices: np.array    Array (frames, N, 3) of mesh points in every frame
+    size: int           Size of square animation field, fits mesh in any rotation by default
+    center: float       Position of mesh origin on both field axes, half of size by default
+    ani_fld: AnimatedField      Mesh animation container
+    stream: bool        Are frames flushed to gif file while drawing, finished by save_figure
+    dtype: str          Type of animation field values, 'uint8' halves memory
+    """
+
+    def __init__(self,
+                 vertices=(),
+                 faces=(),
+                 rot=(0.02, 0.01, 0.01),
+                 frames: int = 60,
+                 x0: int = 0,
+                 y0: int = 0,
+                 size: int = 0,
+                 center: float = None,
+                 opacity: int = 100,
+                 thick: int = 0,
+                 cull: bool = True,
+                 name: str = 'animesh',
+                 stream: bool = False,
+                 dtype: str = 'uint16'):
+        self.name = name
+        self.vertices = np.asarray(vertices, dtype='float64').reshape(-1, 3)
+        self.faces = np.asarray(faces, dtype='int64')
+        self.rot = rot
+        self.frames = frames
+        self.opacity = opacity
+        self.thick = max(0, thick)
+        self.cull = cull
+        if size < 1:
+            size = 2 * int(np.linalg.norm(self.vertices, axis=1).max(initial=0)) + 2 * self.thick + 1
+        self.size = size
+        self.center = self.size / 2 if center is None else center
+        # Rotation is the same for every frame, so matrix is built once
+        self.mrot = Rotation.from_euler('xyz', self.rot).as_matrix()
+        self.frame_vertices = self.rotate_mesh()
+        self.ani_fld = AnimatedField(x0=x0,
+                                     y0=y0,
+                                     x=self.size,
+                                     y=self.size,
+                                     frames=self.frames,
+                                     stream=f'{self.name}.gif' if stream else '',
+                                     dtype=dtype)
+
+        for fr in range(self.frames):
+            self.draw_mesh(fr)
+
+    def draw_mesh(self, frame: int):
+        mesh = MeshFig(vertices=self.frame_vertices[frame],
+                       faces=self.faces,
+                       opacity=self.opacity,
+                       thick=self.thick,
+                       cull=self.cull,
+                       center=(self.center, self.center),
+                       name=self.name)
+        fld = mesh.get_figure()
+        fld.y0 += self.ani_fld.y0
+        fld.x0 += self.ani_fld.x0
+        self.ani_fld.place_art(fld, frame)
+
+    def rotate_mesh(self):
+        # Vertices of every frame as (frames, N, 3) array
+        vertices = np.empty(shape=(self.frames,) + self.vertices.shape)
+        vertices[0] = self.vertices
+        for fr in range(1, self.frames):
+            np.matmul(vertices[fr - 1], self.mrot, out=vertices[fr])
+        return vertices
+
+    def get_figure(self):
+        return self.ani_fld
+
+    def save_figure(self):
+        self.ani_fld.save_field(f'{self.name}.gif')
+
+
+class TheCube(AniMesh):
     """
     l: int              Length of cube side
-    field: ArtField     ArtField that contains cube image
     points: list        List of cube points coordinates
-    vec: tuple         Rotating angles applied to cube (x, y, z)
-    frames: int         How many frames needs to calculate
+    sides: np.array     Array (6, 4) of side vertices indices, counter-clockwise looking from outside
     """
 
-    def __init__(self, ln: int = 1, x0: int = 0, y0: int = 0, rot=(0.02, 0.01, 0.01), frames: int = 300):
+    def __init__(self,
+                 ln: int = 1,
+                 x0: int = 0,
+                 y0: int = 0,
+                 rot=(0.02, 0.01, 0.01),
+                 frames: int = 300,
+                 stream: bool = False):
         self.ln = ln
-        self.rot = rot
-        self.fld = ArtField()
         # Additional len with 45deg rotate
         alen = int(self.ln / 2)
         # Starting position of cube points
@@ -564,67 +1015,29 @@ class TheCube:
                        (alen, alen, alen),
                        (-alen, -alen, alen),
                        (alen, -alen, alen)]
-        self.sides = {}
-        self.max_z = 0
+        sides = {}
         for i in range(3):
-            result1 = []
-            result2 = []
-            for point in self.points:
-                if point[2] > self.max_z:
-                    self.max_z = point[2]
-
-                if point[i] == alen:
-                    result1.append(point)
-
-                else:
-                    result2.append(point)
-
+            result1 = [point for point in self.points if point[i] == alen]
+            result2 = [point for point in self.points if point[i] != alen]
             sqr_sort(result1)
             sqr_sort(result2)
-            self.sides[6 if i*2 == 0 else i*2] = tuple(result1)
-            self.sides[i*2+1] = tuple(result2)
-
-        self.sides = {i: self.sides[i] for i in range(1, 7)}
-
-        self.ani_img = AnimatedField(x0=x0,
-                                     y0=y0,
-                                     x=round(self.ln * sqrt(3)),
-                                     y=round(self.ln * sqrt(3)),
-                                     frames=frames)
-        for fr in range(frames):
-            self.draw_cube(fr)
-            self.rotate_cube()
-
-        self.ani_img.save_field(filename='cube.gif')
-
-    def draw_cube(self, frame: int):
-        self.fld = ArtField(x=round(self.ln * sqrt(3)),
-                            y=round(self.ln * sqrt(3)))
-        for i in range(1, 7):
-            is_back = False
-            points = []
-            for j in range(4):
-                if self.sides[i][j][2] == self.max_z:
-                    is_back = True
-                y = round(self.sides[i][j][1] + self.ln * sqrt(3) / 2)
-                x = round(self.sides[i][j][0] + self.ln * sqrt(3) / 2)
-                point = (min(y, round(self.ln * sqrt(3))-1) if y > 0 else 0,
-                         min(x, round(self.ln * sqrt(3))-1) if x > 0 else 0)
-                points.append(point)
-            if is_back:
-                continue
-            side_fig = Figure(points_list=points)
-            self.fld += side_fig.get_figure()
-            self.ani_img.place_art(self.fld, frame)
-
-    def rotate_cube(self):
-        self.max_z = 0
-        for ind, side in enumerate(self.sides.values()):
-            points = []
-            for pts in side:
-                mrot = Rotation.from_euler('xyz', self.rot).as_matrix()
-                rot_p = np.squeeze(np.matmul(list(pts), mrot))
-                if rot_p[2] > self.max_z:
-                    self.max_z = rot_p[2]
-                points.append(tuple(rot_p))
-            self.sides[ind+1] = tuple(points)
+            sides[6 if i*2 == 0 else i*2] = [self.points.index(point) for point in result1]
+            sides[i*2+1] = [self.points.index(point) for point in result2]
+
+        self.sides = np.array([sides[i] for i in range(1, 7)])
+        # Turning sides to look outside of cube
+        vertices = np.array(self.points, dtype='float64')
+        inward = (face_normals(vertices, self.sides) * vertices[self.sides].sum(axis=1)).sum(axis=1) < 0
+        self.sides[inward] = self.sides[inward, ::-1]
+
+        super().__init__(vertices=vertices,
+                         faces=self.sides,
+                         rot=rot,
+                         frames=frames,
+                         x0=x0,
+                         y0=y0,
+                         size=round(self.ln * sqrt(3)),
+                         center=self.ln * sqrt(3) / 2,
+                         name='cube',
+                         stream=stream)
+        self.save_figure()
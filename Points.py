@@ -1,4 +1,84 @@
-from math import sqrt
+from functools import lru_cache
+from math import sqrt, sin, cos, pi, radians
+import numpy as np
+
+SYM_MODES = ('xy0', 'mid', 'fp')
+
+
+class PointSet:
+    """
+    Points (y, x) kept in one contiguous int32 (N, 2) array, behaves like list of (y, x) tuples.
+    Slices share array with source set, concatenation and repetition build one new array,
+    points out of int32 range aren't wrapped but raise
+    pts: np.array       Array (N, 2) of points
+    """
+
+    def __init__(self, points=()):
+        if isinstance(points, PointSet):
+            self.pts = points.pts
+        else:
+            pts = np.asarray(points).reshape(-1, 2)
+            limits = np.iinfo('int32')
+            if pts.size and pts.dtype != 'int32' and not (limits.min <= pts.min() and pts.max() <= limits.max):
+                print('Points are out of int32 range of PointSet')
+                raise Exception
+            self.pts = np.ascontiguousarray(pts, dtype='int32')
+
+    @classmethod
+    def concat(cls, sets):
+        # One copy for any number of sets
+        return cls(np.concatenate([np.asarray(pts).reshape(-1, 2) for pts in sets]))
+
+    @property
+    def ys(self):
+        return self.pts[:, 0]
+
+    @property
+    def xs(self):
+        return self.pts[:, 1]
+
+    def bounds(self):
+        # (min_y, min_x, max_y, max_x) of points
+        return (*(int(v) for v in self.pts.min(axis=0)), *(int(v) for v in self.pts.max(axis=0)))
+
+    def translate(self, dy: int = 0, dx: int = 0):
+        return PointSet(self.pts + np.array((dy, dx), dtype='int64'))
+
+    def wrap(self, start: int, stop: int):
+        # Points of range [start, stop) taken by modulo of set length, range inside of set is taken without copy
+        if 0 <= start <= stop <= len(self):
+            return self[start:stop]
+        return PointSet(np.take(self.pts, np.arange(start, stop), axis=0, mode='wrap'))
+
+    def tolist(self):
+        return [tuple(point) for point in self.pts.tolist()]
+
+    def __array__(self, dtype=None, copy=None):
+        # Copy is made unless caller allows sharing the buffer
+        return np.array(self.pts, dtype=dtype, copy=copy)
+
+    def __len__(self):
+        return len(self.pts)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return tuple(self.pts[key].tolist())
+        return PointSet(self.pts[key])
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __add__(self, other):
+        return PointSet.concat((self, other))
+
+    def __radd__(self, other):
+        return PointSet.concat((other, self))
+
+    def __mul__(self, n: int):
+        return PointSet(np.tile(self.pts, (max(0, n), 1)))
+
+    def __repr__(self):
+        return f'PointSet({self.pts.tolist()})'
 
 
 def circle_pts(r=1, x0=0, y0=0):
@@ -14,6 +94,161 @@ def circle_pts(r=1, x0=0, y0=0):
     return [(y + y0, x + x0) for y, x in crl_pts]
 
 
+def fun_values(f, xs, vectorized: bool = True):
+    # NumPy aware function is called once for all X, other functions - once for every X
+    if vectorized:
+        try:
+            with np.errstate(all='ignore'):
+                ys = np.asarray(f(xs), dtype='float64')
+            # Scalar of function that ignores X may differ for every X, so it isn't broadcast
+            if ys.ndim == 0 and xs.size == 1:
+                ys = np.full(shape=xs.shape, fill_value=ys)
+            if ys.shape == xs.shape:
+                return ys
+        except (TypeError, ValueError):
+            pass
+    return np.array([f(x) for x in xs], dtype='float64').reshape(xs.shape)
+
+
+def fun_pts(f, xs, scaling: float = 1, vectorized: bool = True):
+    """
+    Points (y, x) of f graph as (N, 2) int array and indices of points that aren't connected with next one.
+    Points with not finite values or values out of int64 range are dropped and leave a gap
+    """
+    ys = fun_values(f, xs, vectorized=vectorized)
+    return graph_pts(xs, ys, np.full(shape=max(len(xs) - 1, 0), fill_value=False), scaling=scaling)
+
+
+def graph_pts(xs, ys, breaks, scaling: float = 1):
+    # breaks: bool array of len(xs) - 1 items, True if points i and i + 1 must not be connected
+    pts = np.stack((ys * scaling, xs * scaling), axis=1)
+    # Values out of int64 range are dropped like not finite ones
+    with np.errstate(invalid='ignore'):
+        finite = (np.abs(pts) < 2.0 ** 63).all(axis=1)
+    kept = np.flatnonzero(finite)
+    # Break before every dropped point is counted, so gap is left between kept neighbours
+    cum_breaks = np.concatenate(([0], np.cumsum(breaks | ~finite[:-1] | ~finite[1:])))
+    gaps = np.flatnonzero(cum_breaks[kept[1:]] > cum_breaks[kept[:-1]])
+    return np.rint(pts[kept]).astype('int64'), gaps
+
+
+def adaptive_fun_pts(f, x_range, scaling: float = 1, vectorized: bool = True,
+                     max_err: float = 0.5, init_step: int = 8, min_step: float = 1 / 16, jump_levels: int = 4):
+    """
+    Points of f graph sampled densely only where graph bends, by pixel units.
+    Interval is halved while its midpoint is farther than max_err from chord, up to min_step width.
+    Interval whose jump isn't split by halving for jump_levels levels is discontinuity and is left as gap.
+    Jump is split if midpoint value lies between values of ends, so steep monotone branch isn't broken.
+    Sample between gap and interval that still bends at min_step width lies on asymptote and is dropped,
+    points cut off by gaps from both neighbours are dropped too
+    """
+    x_start, x_stop = x_range
+    xs = np.append(np.arange(x_start, x_stop, init_step / scaling), x_stop)
+    fx = fun_values(f, xs, vectorized=vectorized)
+    # Active intervals
+    a, b, fa, fb = xs[:-1], xs[1:], fx[:-1], fx[1:]
+    streak = np.zeros(shape=len(a), dtype='int64')
+    done = []
+
+    while len(a):
+        m = (a + b) / 2
+        fm = fun_values(f, m, vectorized=vectorized)
+        with np.errstate(invalid='ignore'):
+            err = np.abs(fm - (fa + fb) / 2) * scaling
+            jump = np.abs(fb - fa)
+            finite = np.isfinite(fa) & np.isfinite(fb)
+            # Halves of continuous graph split jump, discontinuity keeps whole jump in one half
+            # and its midpoint value isn't between values of ends
+            between = (fm > np.minimum(fa, fb)) & (fm < np.maximum(fa, fb))
+            kept = (np.maximum(np.abs(fm - fa), np.abs(fb - fm)) >= jump * 0.75) & ~between
+            bend = (err > max_err) | ~np.isfinite(err) & (finite | np.isfinite(fm))
+        gap = ~finite | bend & (streak >= jump_levels)
+        refine = bend & ~gap & ((b - a) * scaling > min_step)
+        done.append((a[~refine], fa[~refine], gap[~refine], (bend & ~gap)[~refine]))
+
+        # Streak goes on only in half that keeps the jump
+        with np.errstate(invalid='ignore'):
+            left = np.abs(fm - fa) >= np.abs(fb - fm)
+        child_streak = np.where(kept & finite, streak + 1, 0)
+        left_streak, right_streak = np.where(left, child_streak, 0)[refine], np.where(left, 0, child_streak)[refine]
+        a, b, fa, fb, m, fm = a[refine], b[refine], fa[refine], fb[refine], m[refine], fm[refine]
+        a, b = np.concatenate((a, m)), np.concatenate((m, b))
+        fa, fb = np.concatenate((fa, fm)), np.concatenate((fm, fb))
+        streak = np.concatenate((left_streak, right_streak))
+
+    xs = np.concatenate([part[0] for part in done] + [[x_stop]])
+    ys = np.concatenate([part[1] for part in done] + [[fx[-1]]])
+    order = np.argsort(xs, kind='stable')
+    xs, ys = xs[order], ys[order]
+    breaks = np.concatenate([part[2] for part in done])[order[:-1]]
+    rough = np.concatenate([part[3] for part in done])[order[:-1]]
+    # Sample that is end of gap and of unresolved steep interval is dropped with a gap left
+    ys[1:-1][breaks[:-1] & rough[1:] | rough[:-1] & breaks[1:]] = np.nan
+    pts, gaps = graph_pts(xs, ys, breaks, scaling=scaling)
+    if len(pts) < 2:
+        return pts, gaps
+
+    # Lone samples next to asymptotes aren't connected to anything and are dropped
+    cut = np.full(shape=len(pts) + 1, fill_value=False)
+    cut[[0, -1]] = True
+    cut[gaps + 1] = True
+    kept = np.flatnonzero(~(cut[:-1] & cut[1:]))
+    cum_gaps = np.concatenate(([0], np.cumsum(cut[1:-1])))
+    return pts[kept], np.flatnonzero(cum_gaps[kept[1:]] > cum_gaps[kept[:-1]])
+
+
+@lru_cache(maxsize=None)
+def unit_polygon(corners: int, shift_degree: int = 0):
+    # Table (corners, 2) of vertices directions (cos, sin), built once for every corners and turn pair
+    rot_deg = round(360 / corners)
+    table = np.array([(cos(radians(shift_degree + i * rot_deg)), sin(radians(shift_degree + i * rot_deg)))
+                      for i in range(corners)])
+    table.flags.writeable = False
+    return table
+
+
+def sym_pts(corners: int, side_lens, shift_degrees=0, first_points=(0, 0), mode: str = 'xy0'):
+    """
+    Vertices (y, x) of N regular polygons with the same number of corners as (N, corners, 2) array
+    corners: int            Number of polygons corners
+    side_lens: array        Lengths of polygons sides
+    shift_degrees: array    Degrees of polygons turn around self center, one for all or one for every polygon
+    first_points: array     Points (y, x) used according to mode, one for all or one for every polygon
+    mode: str               'xy0' - min of polygon, 'mid' - center of polygon, 'fp' - first vertex of polygon
+    """
+    if mode not in SYM_MODES:
+        print(f'Invalid "mode" parameter, use one of {SYM_MODES}')
+        raise Exception
+
+    side_lens = np.asarray(side_lens, dtype='int64').reshape(-1)
+    shifts = np.broadcast_to(np.asarray(shift_degrees, dtype='int64').reshape(-1), side_lens.shape)
+    fps = np.broadcast_to(np.asarray(first_points, dtype='int64').reshape(-1, 2), (len(side_lens), 2))
+    if len(side_lens) == 0:
+        return np.zeros(shape=(0, corners, 2), dtype='int64')
+
+    radius = np.rint(side_lens / (2 * sin(pi / corners)))[:, None, None]
+    # Polygons of one turn share table
+    turns, inverse = np.unique(shifts, return_inverse=True)
+    tables = np.stack([unit_polygon(corners, int(turn)) for turn in turns])[inverse.reshape(-1)]
+
+    if mode == 'xy0':
+        mid = fps + radius[:, 0]
+
+    elif mode == 'mid':
+        mid = fps
+
+    else:
+        mid = fps - np.rint(radius[:, 0] * tables[:, 0])
+
+    pts = np.trunc(mid[:, None] + radius * tables).astype('int64')
+    if mode == 'xy0':
+        pts -= (pts.min(axis=1) - fps)[:, None]
+
+    elif mode == 'fp':
+        pts[:, 0] = fps
+    return pts
+
+
 def mid_pts(pts1, pts2):
     y0, x0 = pts1
     y1, x1 = pts2
@@ -21,7 +256,35 @@ def mid_pts(pts1, pts2):
     return mid
 
 
+def resample_pts(points, n: int, closed: bool = True):
+    """
+    Exactly n points spaced uniformly by arc length along polyline as PointSet
+    points: list        Polyline points (y, x)
+    n: int              Number of result points
+    closed: bool        Is last point connected with first one, for open polyline both ends are kept
+    """
+    pts = np.asarray(points, dtype='float64').reshape(-1, 2)
+    if n < 1 or len(pts) == 0:
+        return PointSet()
+
+    if closed and len(pts) > 1:
+        pts = np.concatenate((pts, pts[:1]))
+    seg = np.diff(pts, axis=0)
+    seg_len = np.hypot(seg[:, 0], seg[:, 1])
+    cum = np.concatenate(([0], np.cumsum(seg_len)))
+    if cum[-1] == 0:
+        return PointSet(np.repeat(np.rint(pts[:1]), n, axis=0))
+
+    # Closed polyline ends in its first point, so it's not repeated
+    dist = np.arange(n) * (cum[-1] / n) if closed else np.linspace(0, cum[-1], n)
+    idx = np.clip(np.searchsorted(cum, dist, side='right') - 1, 0, len(seg) - 1)
+    # Zero length segments are never chosen for inner distances, so their length is only guarded
+    t = (dist - cum[idx]) / np.maximum(seg_len[idx], 1e-12)
+    return PointSet(np.rint(pts[idx] + t[:, None] * seg[idx]))
+
+
 def double_pts(lst: list = (), steps: int = 1, closed: bool = True):
+    # Midpoints are inserted between all neighbour points at every step, PointSet is returned for PointSet
     if steps < 1:
         print('Invalid steps value')
         return lst
@@ -30,23 +293,17 @@ def double_pts(lst: list = (), steps: int = 1, closed: bool = True):
         print('Double_pts gave null list')
         return lst
 
-    elif len(lst) == 1:
-        result = lst * (2 ** steps)
+    pts = np.asarray(lst, dtype='int64').reshape(-1, 2)
+    if len(pts) == 1:
+        pts = np.repeat(pts, 2 ** steps, axis=0)
 
     else:
-        result = lst
-        for _ in range(max(steps, 0)):
-            tmp_list = []
-
-            for i in range(len(result) - 1):
-                tmp_list.append(result[i])
-                tmp_list.append(mid_pts(result[i], result[i + 1]))
-
-            tmp_list.append(result[-1])
-            if closed:
-                tmp_list.append(mid_pts(result[-1], result[0]))
-            result = tmp_list
-    return result
+        for _ in range(steps):
+            mids = np.rint((pts + np.roll(pts, -1, axis=0)) / 2).astype('int64')
+            pts = np.stack((pts, mids), axis=1).reshape(-1, 2)
+            if not closed:
+                pts = pts[:-1]
+    return PointSet(pts) if isinstance(lst, PointSet) else [tuple(point) for point in pts.tolist()]
 
 
 def drop_n_lst(lst: list, n: int = 0):
@@ -56,17 +313,19 @@ def drop_n_lst(lst: list, n: int = 0):
         return
     # A little troubles with big float nums but working well in 100000 range
     trg_len = len_lst - n
-    result = []
+    kept = []
     i = 0
     sep = trg_len / len_lst / 2
-    while trg_len > len(result):
+    while trg_len > len(kept):
         sep += trg_len / len_lst
         if sep > 1:
             sep -= 1
-            result.append(lst[i])
+            kept.append(i)
         i += 1
 
-    return result
+    if isinstance(lst, PointSet):
+        return lst[np.array(kept, dtype='int64')]
+    return [lst[i] for i in kept]
 
 
 def sqr_sort(pts: list):
@@ -84,4 +343,14 @@ def sqr_sort(pts: list):
         pts[3], pts[2] = pts[2], pts[3]
 
 
+def face_normals(vertices, faces):
+    # Newell's method, works for any number of face corners
+    pts = np.asarray(vertices, dtype='float64')[np.asarray(faces)]
+    return np.cross(pts, np.roll(pts, -1, axis=1)).sum(axis=1)
+
 
+def mesh_edges(faces):
+    # Unique edges of faces, edge shared by two faces is returned once
+    faces = np.asarray(faces, dtype='int64')
+    edges = np.stack((faces, np.roll(faces, -1, axis=1)), axis=-1).reshape(-1, 2)
+    return np.unique(np.sort(edges, axis=1), axis=0)
@@ -0,0 +1,393 @@
+from functools import lru_cache
+from math import sqrt
+import numpy as np
+from scipy.ndimage import binary_dilation
+from Fields import overlap
+
+
+def clip_segments(starts, ends, box):
+    """
+    Liang-Barsky clipping of segments starts[i] -> ends[i] by box, all segments at once.
+    Returns parameters t0, t1 of visible part start + t * (end - start) and mask of visible segments
+    starts: array       Array (N, 2) of segments start points (y, x)
+    ends: array         Array (N, 2) of segments end points (y, x)
+    box: tuple          Clip box (y0, y1, x0, x1), bounds are included
+    """
+    starts = np.asarray(starts, dtype='float64').reshape(-1, 2)
+    ends = np.asarray(ends, dtype='float64').reshape(-1, 2)
+    delta = ends - starts
+    # Segment is inside of box edge while p * t <= q
+    p = np.stack((-delta[:, 0], delta[:, 0], -delta[:, 1], delta[:, 1]), axis=1)
+    q = np.stack((starts[:, 0] - box[0], box[1] - starts[:, 0],
+                  starts[:, 1] - box[2], box[3] - starts[:, 1]), axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = q / p
+    t0 = np.where(p < 0, r, 0).max(axis=1, initial=0)
+    t1 = np.where(p > 0, r, 1).min(axis=1, initial=1)
+    # Segments parallel to box edge are visible only from inner side of it
+    visible = ((p != 0) | (q >= 0)).all(axis=1) & (t0 <= t1)
+    return t0, t1, visible
+
+
+def segments_pts(starts, ends, box=None):
+    """
+    Pixels of segments starts[i] -> ends[i] as (ys, xs) index arrays.
+    End point of segment isn't included, pixels of different segments may repeat.
+    starts: array       Array (N, 2) of segments start points (y, x)
+    ends: array         Array (N, 2) of segments end points (y, x)
+    box: tuple          Box (y0, y1, x0, x1) that pixels are clipped by, steps out of it aren't generated
+    """
+    starts = np.asarray(starts, dtype='int64').reshape(-1, 2)
+    ends = np.asarray(ends, dtype='int64').reshape(-1, 2)
+    delta = ends - starts
+    sdy, sdx = np.sign(delta[:, 0]), np.sign(delta[:, 1])
+    ady, adx = np.abs(delta[:, 0]), np.abs(delta[:, 1])
+    # Steps by X (k / adx) and by Y (m / ady) placed on common scale adx * ady,
+    # steps of straight segments placed on their own axis scale
+    ady1, adx1 = np.maximum(ady, 1), np.maximum(adx, 1)
+
+    def steps(lows, counts):
+        seg = np.repeat(np.arange(len(counts)), counts)
+        first = np.cumsum(counts) - counts
+        return seg, np.arange(len(seg)) - np.repeat(first - lows, counts)
+
+    def step_range(count, t0, t1):
+        # Pixel of step k lies within 2 pixels from segment point of t = k / count,
+        # range is widened by float error of t on long segments
+        slack = (count * 2.0 ** -45).astype('int64')
+        lows = np.maximum(np.floor(t0 * count).astype('int64') - slack, 1)
+        highs = np.minimum(np.ceil(t1 * count).astype('int64') + slack, count)
+        return lows, np.maximum(highs - lows + 1, 0)
+
+    if box is None:
+        x_lows, x_counts = np.ones_like(adx), adx
+        y_lows, y_counts = np.ones_like(ady), ady
+
+    else:
+        t0, t1, visible = clip_segments(starts, ends, (box[0] - 2, box[1] + 2, box[2] - 2, box[3] + 2))
+        x_lows, x_counts = step_range(adx, t0, t1)
+        y_lows, y_counts = step_range(ady, t0, t1)
+        x_counts, y_counts = x_counts * visible, y_counts * visible
+
+    x_seg, x_num = steps(x_lows, x_counts)
+    y_seg, y_num = steps(y_lows, y_counts)
+    # Coinciding X and Y steps give the same diagonal pixel twice
+    seg = np.concatenate((x_seg, y_seg))
+    num = np.concatenate((x_num, y_num))
+    scale = np.concatenate((ady1[x_seg], adx1[y_seg]))
+    # Common scale of huge segments doesn't fit int64, their steps are counted by Python integers
+    if (adx1.astype('float64') * ady1 >= 2.0 ** 62)[seg].any():
+        num, scale = num.astype(object), scale.astype(object)
+    ev = num * scale - 1
+    ys = (starts[seg, 0] + sdy[seg] * (ev // adx1[seg])).astype('int64')
+    xs = (starts[seg, 1] + sdx[seg] * (ev // ady1[seg])).astype('int64')
+    if box is not None:
+        keep = (ys >= box[0]) & (ys <= box[1]) & (xs >= box[2]) & (xs <= box[3])
+        ys, xs = ys[keep], xs[keep]
+    return ys, xs
+
+
+def line_pts(point0, point1):
+    """
+    Pixels of segment point0 -> point1 in drawing order as (ys, xs) index arrays, end point isn't included
+    """
+    ys, xs = segments_pts([point0], [point1])
+    # Every step moves pixel at least by one axis, so distance along axes sorts path
+    order = np.unique(np.abs(ys - point0[0]) + np.abs(xs - point0[1]), return_index=True)[1]
+    return ys[order], xs[order]
+
+
+def polyline_segments(points, closed: bool = True, gaps=()):
+    """
+    Start and end points of polyline segments in drawing order
+    points: list        List of polyline points (y, x)
+    closed: bool        Is last point connected with first one
+    gaps: list          Indices of points that aren't connected with next point
+    """
+    pts = np.asarray(points, dtype='int64').reshape(-1, 2)
+    gaps = np.asarray(gaps, dtype='int64')
+    if closed and len(pts) > 2:
+        starts, ends = np.roll(pts, 1, axis=0), pts
+        # Segment from point i is placed in i + 1 position
+        gaps = (gaps + 1) % len(pts)
+
+    else:
+        starts, ends = pts[:-1], pts[1:]
+        gaps = gaps[gaps < len(starts)]
+
+    if len(gaps):
+        keep = np.full(shape=len(starts), fill_value=True, dtype='bool')
+        keep[gaps] = False
+        starts, ends = starts[keep], ends[keep]
+    return starts, ends
+
+
+@lru_cache(maxsize=None)
+def brush_stamp(shape: str = 'disc', thick: int = 0):
+    """
+    Boolean (2 * thick + 1) square stamp of brush, built once for every shape and thick pair
+    shape: str          'disc' for line ends and single dots, 'crest' for line body
+    thick: int          Thick of figure lines
+    """
+    stamp = np.full(shape=(2 * thick + 1, 2 * thick + 1), fill_value=False, dtype='bool')
+
+    if shape == 'disc':
+        for x in range(thick + 1):
+            y = round(sqrt(thick ** 2 - x ** 2))
+            stamp[thick - y: thick + y + 1, thick + x] = True
+            stamp[thick - y: thick + y + 1, thick - x] = True
+
+    elif shape == 'crest':
+        stamp[:, thick] = True
+        stamp[thick, :] = True
+
+    else:
+        print(f'Unknown brush shape {shape}')
+        raise Exception
+
+    stamp.flags.writeable = False
+    return stamp
+
+
+def stamp_pts(msk, ys, xs, stamp, value=True):
+    """
+    Writes stamp centered in every (ys, xs) pixel, parts of stamp out of msk bounds are clipped
+    msk: np.array       Mask or field container
+    stamp: np.array     Boolean stamp from brush_stamp
+    value:              Value written in stamped pixels
+    """
+    ys, xs = np.asarray(ys, dtype='int64'), np.asarray(xs, dtype='int64')
+    if len(ys) == 0:
+        return msk
+
+    r = stamp.shape[0] // 2
+    hei, wid = msk.shape
+    inside = ys.min() >= r and xs.min() >= r and ys.max() < hei - r and xs.max() < wid - r
+    # Dense paths are cheaper to dilate as a whole
+    if inside and msk.dtype == bool and value is True and len(ys) * np.count_nonzero(stamp) > msk.size:
+        path_msk = np.zeros(shape=msk.shape, dtype='bool')
+        path_msk[ys, xs] = True
+        msk |= binary_dilation(path_msk, structure=stamp)
+        return msk
+
+    for dy, dx in np.argwhere(stamp) - r:
+        py, px = ys + dy, xs + dx
+
+        if not inside:
+            keep = (py >= 0) & (py < hei) & (px >= 0) & (px < wid)
+            py, px = py[keep], px[keep]
+        msk[py, px] = value
+    return msk
+
+
+class SparseMask:
+    """
+    Mask that keeps pixels as flat indices and turns to dense boolean array when coverage makes it cheaper
+    shape: tuple        Shape of masked field
+    parts: list         Arrays of flat indices of pixels, may repeat
+    count: int          Number of collected indices
+    dense: np.array     Dense mask, None while mask is sparse
+    """
+    # Max share of field covered by collected indices that is kept sparse
+    dense_ratio = 1 / 8
+
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        self.parts = []
+        self.count = 0
+        self.dense = None
+
+    def add(self, ys, xs, stamp):
+        # Stamp centered in every (ys, xs) pixel, parts of stamp out of field are clipped
+        ys, xs = np.asarray(ys, dtype='int64'), np.asarray(xs, dtype='int64')
+        offsets = np.argwhere(stamp) - stamp.shape[0] // 2
+        if self.dense is None and self.count + len(ys) * len(offsets) > self.dense_ratio * np.prod(self.shape):
+            self.densify()
+
+        if self.dense is not None:
+            stamp_pts(self.dense, ys, xs, stamp)
+            return self
+
+        py, px = ys + offsets[:, :1], xs + offsets[:, 1:]
+        keep = (py >= 0) & (py < self.shape[0]) & (px >= 0) & (px < self.shape[1])
+        self.parts.append(py[keep] * self.shape[1] + px[keep])
+        self.count += len(self.parts[-1])
+        return self
+
+    def add_block(self, y0: int, x0: int, block):
+        # Boolean block placed with its corner in (y0, x0), parts out of field are clipped
+        region = overlap(self.shape, block.shape, y0, x0)
+        if region is None:
+            return self
+
+        if self.dense is None and self.count + block[region[1]].sum() > self.dense_ratio * np.prod(self.shape):
+            self.densify()
+
+        if self.dense is not None:
+            self.dense[region[0]] |= block[region[1]]
+            return self
+
+        ys, xs = np.nonzero(block[region[1]])
+        self.parts.append((ys + region[0][0].start) * self.shape[1] + xs + region[0][1].start)
+        self.count += len(self.parts[-1])
+        return self
+
+    def densify(self):
+        dense = np.full(shape=self.shape, fill_value=False, dtype='bool')
+        dense.flat[self.indices()] = True
+        self.dense = dense
+        self.parts = []
+
+    def indices(self):
+        # Unique sorted flat indices of masked pixels
+        if self.dense is not None:
+            return np.flatnonzero(self.dense)
+        return np.unique(np.concatenate(self.parts)) if self.parts else np.zeros(shape=0, dtype='int64')
+
+    def write(self, field, value):
+        if self.dense is not None:
+            field[self.dense] = value
+        else:
+            field.flat[self.indices()] = value
+        return field
+
+
+def first_odd(d, a2):
+    # Smallest y >= 0 with a2 * (2y + 1)^2 >= d, float root is corrected by exact integer checks
+    y = np.maximum(np.ceil((np.sqrt(d / a2) - 1) / 2), 0).astype('int64')
+    y -= (y > 0) & (a2 * (2 * y - 1) ** 2 >= d)
+    y += a2 * (2 * y + 1) ** 2 < d
+    return y
+
+
+def ellipse_quadrant(ry: int, rx: int):
+    """
+    Pixels (ys, xs) of ellipse quarter with y, x >= 0, chosen by integer midpoint rule.
+    Part with slope up to 1 is swept by X and the rest by Y, both parts are found at once, pixels may repeat
+    """
+    # Flat ellipse is a segment
+    if rx == 0:
+        return np.arange(ry + 1), np.zeros(shape=ry + 1, dtype='int64')
+
+    if ry == 0:
+        return np.zeros(shape=rx + 1, dtype='int64'), np.arange(rx + 1)
+
+    ry2, rx2 = ry * ry, rx * rx
+    x = np.arange(rx + 1, dtype='int64')
+    y_of_x = first_odd(4 * ry2 * (rx2 - x * x), rx2)
+    y = np.arange(ry + 1, dtype='int64')
+    x_of_y = first_odd(4 * rx2 * (ry2 - y * y), ry2)
+    by_x, by_y = ry2 * x <= rx2 * y_of_x, rx2 * y <= ry2 * x_of_y
+    # First step out of every part is kept, so parts meet
+    by_x[1:] |= by_x[:-1]
+    by_y[1:] |= by_y[:-1]
+    ys = np.concatenate((y_of_x[by_x], y[by_y]))
+    xs = np.concatenate((x[by_x], x_of_y[by_y]))
+    # Rows and columns of quarter are single spans, filling them joins parts on flat ellipses
+    x_lo, x_hi = np.full(shape=ry + 1, fill_value=rx), np.zeros(shape=ry + 1, dtype='int64')
+    np.minimum.at(x_lo, ys, xs)
+    np.maximum.at(x_hi, ys, xs)
+    y_lo, y_hi = np.full(shape=rx + 1, fill_value=ry), np.zeros(shape=rx + 1, dtype='int64')
+    np.minimum.at(y_lo, xs, ys)
+    np.maximum.at(y_hi, xs, ys)
+    row_ys, row_xs = spans(x_lo, x_hi)
+    col_xs, col_ys = spans(y_lo, y_hi)
+    return np.concatenate((row_ys, col_ys)), np.concatenate((row_xs, col_xs))
+
+
+def spans(lo, hi):
+    # Pixels (rows, cols) of spans [lo[row], hi[row]] of every row, empty spans are skipped
+    lens = np.maximum(hi - lo + 1, 0)
+    rows = np.repeat(np.arange(len(lo)), lens)
+    return rows, np.arange(len(rows)) - np.repeat(np.cumsum(lens) - lens, lens) + np.repeat(lo, lens)
+
+
+def pixel_angles(ys, xs):
+    # Degrees of pixels around origin counted from Y axis to X axis, like turns of SymFigure
+    return np.degrees(np.arctan2(xs, ys)) % 360
+
+
+def in_arc(angles, start: float, end: float):
+    if end - start >= 360:
+        return np.full(shape=np.shape(angles), fill_value=True, dtype='bool')
+    return (angles - start) % 360 <= (end - start) % 360
+
+
+def ellipse_pts(ry: int, rx: int):
+    """
+    Unique pixels (ys, xs) of ellipse centered in origin, ordered by angle
+    """
+    qy, qx = ellipse_quadrant(ry, rx)
+    # Pixels of four quarters are deduplicated by flat index in (2 * ry + 1, 2 * rx + 1) box
+    flat = np.unique(np.concatenate(((ry + qy) * (2 * rx + 1) + rx + qx, (ry + qy) * (2 * rx + 1) + rx - qx,
+                                     (ry - qy) * (2 * rx + 1) + rx + qx, (ry - qy) * (2 * rx + 1) + rx - qx)))
+    ys, xs = flat // (2 * rx + 1) - ry, flat % (2 * rx + 1) - rx
+    order = np.argsort(pixel_angles(ys, xs), kind='stable')
+    return ys[order], xs[order]
+
+
+def ellipse_fill(ry: int, rx: int):
+    """
+    Boolean (2 * ry + 1, 2 * rx + 1) mask of ellipse with inside, every row is one span up to outline
+    """
+    qy, qx = ellipse_quadrant(ry, rx)
+    x_max = np.zeros(shape=ry + 1, dtype='int64')
+    np.maximum.at(x_max, qy, qx)
+    rows = x_max[np.abs(np.arange(-ry, ry + 1))]
+    return np.abs(np.arange(-rx, rx + 1))[None, :] <= rows[:, None]
+
+
+FILL_RULES = ('evenodd', 'nonzero')
+
+
+def polygon_fill(points, shape, rule: str = 'evenodd'):
+    """
+    Boolean mask of inside of closed polygon, rows are crossed at pixel centers by all edges at once
+    points: array       Polygon points (y, x) in mask coordinates
+    shape: tuple        Shape of mask
+    rule: str           'evenodd' - odd number of crossings, 'nonzero' - non-zero winding number
+    """
+    if rule not in FILL_RULES:
+        print(f'Unknown fill rule {rule}, use one of {FILL_RULES}')
+        raise Exception
+
+    pts = np.asarray(points, dtype='int64').reshape(-1, 2)
+    msk = np.full(shape=shape, fill_value=False, dtype='bool')
+    starts, ends = np.roll(pts, 1, axis=0), pts
+    # Horizontal edges don't cross rows, every other edge crosses rows [top, bottom)
+    edges = starts[:, 0] != ends[:, 0]
+    starts, ends = starts[edges], ends[edges]
+    if len(starts) == 0:
+        return msk
+
+    top, bottom = np.minimum(starts[:, 0], ends[:, 0]), np.maximum(starts[:, 0], ends[:, 0])
+    # Rows out of mask aren't crossed
+    top, bottom = np.maximum(top, 0), np.minimum(bottom, shape[0])
+    counts = np.maximum(bottom - top, 0)
+    if counts.sum() == 0:
+        return msk
+    edge = np.repeat(np.arange(len(starts)), counts)
+    rows = np.repeat(top, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    dy, dx = ends[edge, 0] - starts[edge, 0], ends[edge, 1] - starts[edge, 1]
+    cross = starts[edge, 1] + (rows - starts[edge, 0]) * dx / dy
+    order = np.lexsort((cross, rows))
+    rows, cross, wind = rows[order], cross[order], np.sign(dy[order])
+    # Winding number after every crossing, counted from row start
+    if rule == 'evenodd':
+        wind = np.ones_like(wind)
+    total = np.cumsum(wind)
+    first = np.flatnonzero(np.diff(rows, prepend=rows[0] - 1))
+    total -= np.repeat(total[first] - wind[first], np.diff(np.append(first, len(rows))))
+    inside = (total[:-1] % 2 == 1) if rule == 'evenodd' else (total[:-1] != 0)
+    inside &= rows[:-1] == rows[1:]
+    # Span of pixel centers between crossings is written by difference of its ends
+    span_rows = rows[:-1][inside]
+    lo = np.ceil(cross[:-1][inside]).astype('int64')
+    hi = np.floor(cross[1:][inside]).astype('int64') + 1
+    keep = (span_rows >= 0) & (span_rows < shape[0]) & (hi > lo)
+    span_rows, lo, hi = span_rows[keep], np.clip(lo[keep], 0, shape[1]), np.clip(hi[keep], 0, shape[1])
+    diff = np.zeros(shape=(shape[0], shape[1] + 1), dtype='int32')
+    np.add.at(diff, (span_rows, lo), 1)
+    np.add.at(diff, (span_rows, hi), -1)
+    msk[:] = np.cumsum(diff, axis=1)[:, :-1] > 0
+    return msk
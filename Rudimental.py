@@ -1,7 +1,9 @@
+from functools import lru_cache
 from Figures import Figure
 import numpy as np
 from math import sqrt
 from Fields import ArtField
+from Rasters import segments_pts, stamp_pts, brush_stamp
 
 
 class TriangulatedField(Figure):
@@ -10,6 +12,7 @@ class TriangulatedField(Figure):
     side_len: int       Length of triangle side
     x: int              X axis field size
     y: int              Y axis field size
+    cache: bool         Is drawn field cached by sizes and opacity for next fields, False by default
     """
     def __init__(self,
                  x: int = 1,
@@ -18,7 +21,8 @@ class TriangulatedField(Figure):
                  x0: int = 0,
                  y0: int = 0,
                  name='triangulated',
-                 opacity: int = 100):
+                 opacity: int = 100,
+                 cache: bool = False):
         if x < 1 or y < 1 or side_len < 1 or x < side_len or y < side_len:
             print('Wrong axis size format')
             return
@@ -26,39 +30,60 @@ class TriangulatedField(Figure):
             print('Figure has been placed out of field bounds')
             return
 
-        triangle_hei = sqrt(3) / 2 * side_len
-        half_side = int(side_len / 2)
-        self.trn = int(y // triangle_hei)
-
-        self.left_side_pts = [(round(n * triangle_hei), round(half_side * ((n + 1) % 2)))
-                              for n in range(self.trn + 1)]
-
-        self.right_side_pts = [(round(n * triangle_hei), round(x - int(x % side_len) - half_side * ((n + 1) % 2)))
-                               for n in range(self.trn + 1)]
-
-        self.bottom_side_pts = [(0, round(half_side + side_len * n)) for n in range(x//side_len)]
-
-        self.top_side_pts = [(round(y - y % triangle_hei), (half_side * ((self.trn + 1) % 2) + side_len * n))
-                             for n in range(x // side_len + self.trn % 2)]
-
+        self.x = x
+        self.y = y
+        self.side_len = side_len
+        self.cache = cache
         super().__init__(name=name, opacity=opacity)
-        self.img_fld = ArtField(x=round(x - x % side_len) + 1, y=round(y - y % triangle_hei) + 1, x0=x0, y0=y0)
+        self.img_fld = ArtField(x=round(x - x % side_len) + 1, y=round(y - y % (sqrt(3) / 2 * side_len)) + 1,
+                                x0=x0, y0=y0)
         self.draw_lines()
 
     def draw_lines(self):
-        self.img_msk = np.full(shape=self.img_fld.field.shape, fill_value=False, dtype='bool')
-        # Draw horizontal lines
-        for i in range(len(self.left_side_pts)):
-            self.draw_line(self.left_side_pts[i], self.right_side_pts[i])
-        # Draw y = kx lines
-        first_diag_pts_top = self.left_side_pts[1:-1:2] + self.top_side_pts
-        first_diag_pts_bot = self.bottom_side_pts + self.right_side_pts[1:-1:2]
-        for i in range(len(first_diag_pts_bot)):
-            self.draw_line(first_diag_pts_top[i], first_diag_pts_bot[i])
-        # Draw y = -kx lines
-        second_diag_pts_top = self.top_side_pts[self.trn % 2:] + self.right_side_pts[-2 - self.trn % 2:0:-2]
-        second_diag_pts_bot = self.left_side_pts[-2 - self.trn % 2:0:-2] + self.bottom_side_pts
-        for i in range(len(second_diag_pts_bot)):
-            self.draw_line(second_diag_pts_bot[i], second_diag_pts_top[i])
+        if self.cache:
+            np.copyto(self.img_fld.field, triangulated_field(self.x, self.y, self.side_len, self.density))
+            return
+        self.img_fld.field = triangulated_field.__wrapped__(self.x, self.y, self.side_len, self.density)
+        self.img_fld.field.flags.writeable = True
 
-        self.img_fld.field[self.img_msk == True] = self.density
+
+def triangle_lines(x: int, y: int, side_len: int):
+    # Start and end points of all lattice lines
+    triangle_hei = sqrt(3) / 2 * side_len
+    half_side = int(side_len / 2)
+    trn = int(y // triangle_hei)
+    rows = np.arange(trn + 1)
+    cols = np.arange(x // side_len + trn % 2)
+    left_side_pts = np.stack((np.rint(rows * triangle_hei), half_side * ((rows + 1) % 2)), axis=1)
+    right_side_pts = np.stack((np.rint(rows * triangle_hei),
+                               np.rint(x - int(x % side_len) - half_side * ((rows + 1) % 2))), axis=1)
+    bottom_side_pts = np.stack((np.zeros(x // side_len), half_side + side_len * cols[:x // side_len]), axis=1)
+    top_side_pts = np.stack((np.full(len(cols), round(y - y % triangle_hei)),
+                             half_side * ((trn + 1) % 2) + side_len * cols), axis=1)
+    # Horizontal lines, y = kx lines from top and y = -kx lines from bottom
+    families = ((left_side_pts, right_side_pts),
+                (np.concatenate((left_side_pts[1:-1:2], top_side_pts)),
+                 np.concatenate((bottom_side_pts, right_side_pts[1:-1:2]))),
+                (np.concatenate((left_side_pts[-2 - trn % 2:0:-2], bottom_side_pts)),
+                 np.concatenate((top_side_pts[trn % 2:], right_side_pts[-2 - trn % 2:0:-2]))))
+    n = [min(len(starts), len(ends)) for starts, ends in families]
+    starts = np.concatenate([family[0][:n[i]] for i, family in enumerate(families)])
+    ends = np.concatenate([family[1][:n[i]] for i, family in enumerate(families)])
+    return starts.astype('int64'), ends.astype('int64')
+
+
+@lru_cache(maxsize=8)
+def triangulated_field(x: int, y: int, side_len: int, density: int = 255):
+    """
+    Field of triangle lattice, all lines are rasterized by one call and written at once
+    """
+    triangle_hei = sqrt(3) / 2 * side_len
+    msk = np.full(shape=(round(y - y % triangle_hei) + 1, round(x - x % side_len) + 1), fill_value=False, dtype='bool')
+    starts, ends = triangle_lines(x, y, side_len)
+    msk[segments_pts(starts, ends)] = True
+    dots = np.concatenate((starts, ends))
+    stamp_pts(msk, dots[:, 0], dots[:, 1], brush_stamp('disc', 0))
+    field = np.zeros(shape=msk.shape, dtype='uint16')
+    field[msk] = density
+    field.flags.writeable = False
+    return field